@@ -0,0 +1,289 @@
+# Local stand-in for the Telegram Bot API, used by the load generator.
+#
+#   cd bot && python -m benchmarks.fake_bot_api --port 8081 --latency 0.05 --flood-rate 0.01
+#
+# Point a Bot at it with TelegramAPIServer.from_base('http://127.0.0.1:8081').
+# Simulated users push updates with FakeBotApi.push_update() and wait for the
+# bot's replies with FakeBotApi.wait_for_message().
+import argparse
+import asyncio
+import json
+import random
+from collections import Counter, defaultdict
+from time import time
+from typing import Any, Callable
+
+from aiohttp import web
+
+
+BOT_USER = {
+    'id': 1,
+    'is_bot': True,
+    'first_name': 'Bench',
+    'username': 'bench_bot',
+}
+
+FLOOD_METHODS = {
+    'sendMessage',
+    'sendMediaGroup',
+    'sendDocument',
+    'sendPhoto',
+    'sendVideo',
+    'editMessageText',
+    'editMessageReplyMarkup',
+    'deleteMessage',
+    'deleteMessages',
+}
+
+
+def parse_value(value: Any) -> Any:
+    if isinstance(value, str) and value[:1] in ('{', '['):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def chat_object(chat_id: int) -> dict:
+    if chat_id > 0:
+        return {'id': chat_id, 'type': 'private', 'first_name': f'user{chat_id}'}
+    return {'id': chat_id, 'type': 'supergroup', 'title': f'chat{chat_id}'}
+
+
+class FakeBotApi:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        flood_rate: float = 0.0,
+        retry_after: int = 1,
+        file_size: int = 64 * 1024,
+        usd_rub_rate: float = 90.0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.file_size = file_size
+        self.usd_rub_rate = usd_rub_rate
+
+        self.calls: Counter[str] = Counter()
+        self.floods: Counter[str] = Counter()
+        self.messages: dict[int, dict[int, dict]] = defaultdict(dict)
+        self._message_ids: Counter[int] = Counter()
+        self._updates: list[dict] = []
+        self._update_id = 0
+        self._updates_changed = asyncio.Condition()
+        self._messages_changed = asyncio.Condition()
+
+    @property
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/bot{token}/{method}', self.handle_method)
+        app.router.add_get('/file/bot{token}/{path:.+}', self.handle_file)
+        app.router.add_get('/rates/usd.json', self.handle_rates)
+        return app
+
+    def last_message_id(self, chat_id: int) -> int:
+        return self._message_ids[chat_id]
+
+    def next_message_id(self, chat_id: int) -> int:
+        self._message_ids[chat_id] += 1
+        return self._message_ids[chat_id]
+
+    async def push_update(self, update: dict) -> int:
+        async with self._updates_changed:
+            self._update_id += 1
+            update['update_id'] = self._update_id
+            self._updates.append(update)
+            self._updates_changed.notify_all()
+        return self._update_id
+
+    async def wait_for_message(
+        self,
+        chat_id: int,
+        predicate: Callable[[dict], bool],
+        timeout: float = 30,
+    ) -> dict:
+        def find():
+            for message in self.messages[chat_id].values():
+                if not message.get('deleted') and predicate(message):
+                    return message
+            return None
+
+        async with self._messages_changed:
+            return await asyncio.wait_for(self._messages_changed.wait_for(find), timeout)
+
+    async def _store(self, message: dict) -> dict:
+        async with self._messages_changed:
+            self.messages[message['chat']['id']][message['message_id']] = message
+            self._messages_changed.notify_all()
+        return message
+
+    def _reply_to(self, chat_id: int, params: dict) -> dict | None:
+        reply_to_message_id = params.get('reply_to_message_id')
+        reply_parameters = params.get('reply_parameters')
+        if reply_parameters:
+            reply_to_message_id = reply_parameters.get('message_id')
+        if reply_to_message_id is None:
+            return None
+        reply_to = self.messages[chat_id].get(int(reply_to_message_id))
+        if reply_to is None:
+            return None
+        return {key: value for key, value in reply_to.items() if key not in ('reply_to_message', 'deleted')}
+
+    def _new_message(self, chat_id: int, params: dict, **content: Any) -> dict:
+        message = {
+            'message_id': self.next_message_id(chat_id),
+            'date': int(time()),
+            'chat': chat_object(chat_id),
+            'from': BOT_USER,
+            **content,
+        }
+        if params.get('reply_markup'):
+            message['reply_markup'] = params['reply_markup']
+        reply_to = self._reply_to(chat_id, params)
+        if reply_to:
+            message['reply_to_message'] = reply_to
+        return message
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        params = {key: parse_value(value) for key, value in (await request.post()).items()}
+        self.calls[method] += 1
+
+        if method != 'getUpdates':
+            await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        if method in FLOOD_METHODS and random.random() < self.flood_rate:
+            self.floods[method] += 1
+            return web.json_response({
+                'ok': False,
+                'error_code': 429,
+                'description': f'Too Many Requests: retry after {self.retry_after}',
+                'parameters': {'retry_after': self.retry_after},
+            }, status=429)
+
+        handler = getattr(self, f'method_{method}', None)
+        result = await handler(params) if handler else True
+        return web.json_response({'ok': True, 'result': result})
+
+    async def handle_file(self, request: web.Request) -> web.Response:
+        self.calls['downloadFile'] += 1
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        return web.Response(body=b'\0' * self.file_size, content_type='application/octet-stream')
+
+    async def handle_rates(self, request: web.Request) -> web.Response:
+        return web.json_response({'usd': {'rub': self.usd_rub_rate}})
+
+    async def method_getMe(self, params: dict) -> dict:
+        return BOT_USER
+
+    async def method_getUpdates(self, params: dict) -> list[dict]:
+        offset = int(params.get('offset') or 0)
+        timeout = float(params.get('timeout') or 0)
+        async with self._updates_changed:
+            self._updates = [update for update in self._updates if update['update_id'] >= offset]
+            if not self._updates and timeout:
+                try:
+                    await asyncio.wait_for(self._updates_changed.wait_for(lambda: self._updates), timeout)
+                except TimeoutError:
+                    pass
+            return list(self._updates[:100])
+
+    async def method_sendMessage(self, params: dict) -> dict:
+        chat_id = int(params['chat_id'])
+        return await self._store(self._new_message(chat_id, params, text=params['text']))
+
+    async def method_sendMediaGroup(self, params: dict) -> list[dict]:
+        chat_id = int(params['chat_id'])
+        messages = []
+        for media in params['media']:
+            file_id = media['media'] if not str(media['media']).startswith('attach://') else f'upload{random.getrandbits(32)}'
+            file = {'file_id': file_id, 'file_unique_id': f'u{file_id}', 'file_size': self.file_size}
+            if media['type'] == 'photo':
+                content = {'photo': [{**file, 'width': 1280, 'height': 720}]}
+            elif media['type'] == 'video':
+                content = {'video': {**file, 'width': 1280, 'height': 720, 'duration': 1}}
+            else:
+                content = {'document': {**file, 'file_name': f'{file_id}.bin'}}
+            if media.get('caption'):
+                content['caption'] = media['caption']
+            message = self._new_message(chat_id, params, media_group_id=f'g{chat_id}_{self._message_ids[chat_id]}', **content)
+            messages.append(await self._store(message))
+        return messages
+
+    async def method_editMessageText(self, params: dict) -> dict | bool:
+        message = self.messages[int(params['chat_id'])].get(int(params['message_id']))
+        if message is None:
+            return True
+        message = {**message, 'text': params['text'], 'edit_date': int(time())}
+        message.pop('reply_markup', None)
+        if params.get('reply_markup'):
+            message['reply_markup'] = params['reply_markup']
+        return await self._store(message)
+
+    async def method_editMessageReplyMarkup(self, params: dict) -> dict | bool:
+        message = self.messages[int(params['chat_id'])].get(int(params['message_id']))
+        if message is None:
+            return True
+        message = {**message, 'edit_date': int(time())}
+        message.pop('reply_markup', None)
+        if params.get('reply_markup'):
+            message['reply_markup'] = params['reply_markup']
+        return await self._store(message)
+
+    async def method_deleteMessage(self, params: dict) -> bool:
+        message = self.messages[int(params['chat_id'])].get(int(params['message_id']))
+        if message is not None:
+            await self._store({**message, 'deleted': True})
+        return True
+
+    async def method_deleteMessages(self, params: dict) -> bool:
+        for message_id in params['message_ids']:
+            await self.method_deleteMessage({'chat_id': params['chat_id'], 'message_id': message_id})
+        return True
+
+    async def method_getFile(self, params: dict) -> dict:
+        file_id = params['file_id']
+        return {
+            'file_id': file_id,
+            'file_unique_id': f'u{file_id}',
+            'file_size': self.file_size,
+            'file_path': f'files/{file_id}',
+        }
+
+
+async def serve(api: FakeBotApi, host: str, port: int) -> web.AppRunner:
+    runner = web.AppRunner(api.app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Telegram Bot API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every call')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra seconds, up to this value')
+    parser.add_argument('--flood-rate', type=float, default=0.0, help='share of send/edit/delete calls answered with 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    args = parser.parse_args()
+
+    api = FakeBotApi(
+        latency=args.latency,
+        jitter=args.jitter,
+        flood_rate=args.flood_rate,
+        retry_after=args.retry_after,
+    )
+    await serve(api, args.host, args.port)
+    print(f'Fake Bot API listening on http://{args.host}:{args.port}')
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,177 @@
+# Seeds a scratch schema with the tables behind the bot's hot lookups and compares their latency
+# before and after the indexes from revision 8b1f3c6d2a94.
+#
+#   cd bot && python -m benchmarks.index_lookups --messages 1000000
+#
+# Uses the POSTGRES_* settings from .env, so point them at a local database.
+import argparse
+import asyncio
+import random
+import statistics
+from time import perf_counter
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.settings import settings
+
+
+SCHEMA = 'bench_indexes'
+
+CREATE_TABLES = [
+    f'CREATE TABLE {SCHEMA}.orders ('
+    'id uuid PRIMARY KEY, initiator_id uuid NOT NULL, state text NOT NULL, created_at timestamp NOT NULL)',
+    f'CREATE TABLE {SCHEMA}.messages ('
+    'id uuid PRIMARY KEY, chat_id bigint NOT NULL, message_id bigint NOT NULL, '
+    f'message_type text NOT NULL, order_id uuid NOT NULL REFERENCES {SCHEMA}.orders(id), created_at timestamp NOT NULL)',
+    f'CREATE TABLE {SCHEMA}.files ('
+    'id uuid PRIMARY KEY, file_id text NOT NULL, media_type text NOT NULL, '
+    f'order_id uuid NOT NULL REFERENCES {SCHEMA}.orders(id), created_at timestamp NOT NULL)',
+    f'CREATE TABLE {SCHEMA}.users_roles ('
+    'id uuid PRIMARY KEY, user_id uuid NOT NULL, role text NOT NULL, created_at timestamp NOT NULL)',
+    f'CREATE TABLE {SCHEMA}.relations ('
+    'id uuid PRIMARY KEY, initiator_id uuid NOT NULL, first_inspector_id uuid, created_at timestamp NOT NULL)',
+    f'CREATE TABLE {SCHEMA}.configs ('
+    'id uuid PRIMARY KEY, key text NOT NULL, data json NOT NULL, created_at timestamp NOT NULL)',
+]
+
+SEED = [
+    f'INSERT INTO {SCHEMA}.orders '
+    "SELECT md5('o' || i)::uuid, md5('u' || (i % :initiators))::uuid, "
+    "(ARRAY['PENDING','SUCCESS','CANCELED','PAID'])[1 + i % 4], now() "
+    'FROM generate_series(1, :orders) AS i',
+    f'INSERT INTO {SCHEMA}.messages '
+    "SELECT md5('m' || i)::uuid, i % :chats, i, "
+    "(ARRAY['INITIATOR_MESSAGE','INSPECTOR_MESSAGE','PAYEER_MESSAGE'])[1 + i % 3], "
+    "md5('o' || (1 + i % :orders))::uuid, now() "
+    'FROM generate_series(1, :messages) AS i',
+    f'INSERT INTO {SCHEMA}.files '
+    "SELECT md5('f' || i)::uuid, 'file_' || i, (ARRAY['PHOTO','DOCUMENT','VIDEO'])[1 + i % 3], "
+    "md5('o' || (1 + i % :orders))::uuid, now() "
+    'FROM generate_series(1, :orders * 3) AS i',
+    f'INSERT INTO {SCHEMA}.users_roles '
+    "SELECT md5('r' || i)::uuid, md5('u' || (i % :users))::uuid, "
+    "(ARRAY['INITIATOR','INSPECTOR','ADMIN','PAYEER'])[1 + i % 4], now() "
+    'FROM generate_series(1, :users * 2) AS i',
+    f'INSERT INTO {SCHEMA}.relations '
+    "SELECT md5('rel' || i)::uuid, md5('u' || i)::uuid, md5('u' || (i + 1))::uuid, now() "
+    'FROM generate_series(0, :users - 1) AS i',
+    f'INSERT INTO {SCHEMA}.configs '
+    "SELECT md5('c' || i)::uuid, 'key_' || i, '{}', now() "
+    'FROM generate_series(1, :configs) AS i',
+]
+
+INDEXES = [
+    f'CREATE INDEX ix_messages_chat_id_message_id ON {SCHEMA}.messages (chat_id, message_id)',
+    f'CREATE INDEX ix_messages_order_id_message_type ON {SCHEMA}.messages (order_id, message_type)',
+    f'CREATE INDEX ix_orders_initiator_id_state ON {SCHEMA}.orders (initiator_id, state)',
+    f'CREATE INDEX ix_files_order_id ON {SCHEMA}.files (order_id)',
+    f'CREATE INDEX ix_users_roles_user_id ON {SCHEMA}.users_roles (user_id)',
+    f'CREATE INDEX ix_relations_initiator_id ON {SCHEMA}.relations (initiator_id)',
+    f'ALTER TABLE {SCHEMA}.configs ADD CONSTRAINT configs_key_key UNIQUE (key)',
+]
+
+TABLES = ['orders', 'messages', 'files', 'users_roles', 'relations', 'configs']
+
+LOOKUPS = {
+    'messages(chat_id, message_id)': (
+        f'SELECT * FROM {SCHEMA}.messages WHERE chat_id = :chat_id AND message_id = :message_id',
+        lambda args: {'chat_id': (n := random.randint(1, args.messages)) % args.chats, 'message_id': n},
+    ),
+    'messages(order_id, message_type)': (
+        f"SELECT * FROM {SCHEMA}.messages WHERE order_id = md5('o' || :n)::uuid AND message_type = 'INSPECTOR_MESSAGE'",
+        lambda args: {'n': str(random.randint(1, args.orders))},
+    ),
+    'orders(initiator_id, state)': (
+        f"SELECT * FROM {SCHEMA}.orders WHERE initiator_id = md5('u' || :n)::uuid AND state = 'PENDING'",
+        lambda args: {'n': str(random.randint(0, args.initiators - 1))},
+    ),
+    'files(order_id)': (
+        f"SELECT * FROM {SCHEMA}.files WHERE order_id = md5('o' || :n)::uuid",
+        lambda args: {'n': str(random.randint(1, args.orders))},
+    ),
+    'users_roles(user_id)': (
+        f"SELECT * FROM {SCHEMA}.users_roles WHERE user_id = md5('u' || :n)::uuid",
+        lambda args: {'n': str(random.randint(0, args.users - 1))},
+    ),
+    'relations(initiator_id)': (
+        f"SELECT * FROM {SCHEMA}.relations WHERE initiator_id = md5('u' || :n)::uuid",
+        lambda args: {'n': str(random.randint(0, args.users - 1))},
+    ),
+    'configs(key)': (
+        f'SELECT * FROM {SCHEMA}.configs WHERE key = :key',
+        lambda args: {'key': f'key_{random.randint(1, args.configs)}'},
+    ),
+}
+
+
+async def measure(engine, args) -> dict[str, list[float]]:
+    timings = {}
+    async with engine.connect() as conn:
+        for name, (query, params) in LOOKUPS.items():
+            samples = []
+            for _ in range(args.repeat):
+                start = perf_counter()
+                await conn.execute(text(query), params(args))
+                samples.append((perf_counter() - start) * 1000)
+            timings[name] = samples
+    return timings
+
+
+def report(title: str, timings: dict[str, list[float]]) -> None:
+    print(f'\n{title}')
+    for name, samples in timings.items():
+        samples = sorted(samples)
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(f'  {name:<36} p50 {statistics.median(samples):8.3f} ms   p99 {p99:8.3f} ms')
+
+
+async def main(args) -> None:
+    engine = create_async_engine(settings.database.url)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE'))
+            await conn.execute(text(f'CREATE SCHEMA {SCHEMA}'))
+            for query in CREATE_TABLES:
+                await conn.execute(text(query))
+            start = perf_counter()
+            for query in SEED:
+                await conn.execute(text(query), {
+                    'orders': args.orders,
+                    'messages': args.messages,
+                    'chats': args.chats,
+                    'initiators': args.initiators,
+                    'users': args.users,
+                    'configs': args.configs,
+                })
+            for table in TABLES:
+                await conn.execute(text(f'ANALYZE {SCHEMA}.{table}'))
+            print(f'Seeded {args.messages} messages in {perf_counter() - start:.1f} s')
+
+        report('Without indexes', await measure(engine, args))
+
+        async with engine.begin() as conn:
+            for query in INDEXES:
+                await conn.execute(text(query))
+            for table in TABLES:
+                await conn.execute(text(f'ANALYZE {SCHEMA}.{table}'))
+
+        report('With indexes', await measure(engine, args))
+    finally:
+        if not args.keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE'))
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    parser.add_argument('--orders', type=int, default=100_000)
+    parser.add_argument('--chats', type=int, default=500)
+    parser.add_argument('--initiators', type=int, default=200)
+    parser.add_argument('--users', type=int, default=50_000)
+    parser.add_argument('--configs', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--keep', action='store_true')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,335 @@
+# Drives simulated initiators, inspectors and payeers through the whole order flow
+# (/order -> mark_order -> pay_order) against the fake Bot API and reports throughput,
+# per-handler latency and Bot API calls per order.
+#
+#   cd bot && alembic upgrade head
+#   cd bot && python -m benchmarks.load_generator --initiators 20 --orders 5 --latency 0.05
+#
+# The bot runs in this process with the real dispatcher, middlewares and database.
+# Point the POSTGRES_* settings at a throwaway database: the run adds bench users,
+# relations and orders and replaces the payeer chat config. With --files the bot
+# downloads attachments to /data/files, so that directory must be writable.
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import statistics
+from collections import Counter
+from datetime import datetime
+from time import monotonic, time
+from typing import Any
+from uuid import UUID, uuid4
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from benchmarks.fake_bot_api import FakeBotApi, serve
+from core import models
+from core.middlewares.api_metrics_middleware import ApiMetricsMiddleware
+from core.middlewares.outbound_middleware import OutboundMiddleware
+from core.settings import settings
+from core.utils.config_store import config_store
+from core.utils.enums import OrderActionEnum, OrderStateEnum, UserRoleEnum
+from core.utils.exchange_rate import rate_provider
+from core.utils.maps import STATE_ENUM_TO_TEXT
+from core.utils.order_callback import OrderCallback
+from main import create_dispatcher
+
+
+ORDER_ID = re.compile(r'ID: ([0-9a-f-]{36})')
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+class SimulatedUser:
+    def __init__(self, api: FakeBotApi, user_id: int, username: str):
+        self.api = api
+        self.user_id = user_id
+        self.username = username
+
+    @property
+    def user(self) -> dict:
+        return {'id': self.user_id, 'is_bot': False, 'first_name': self.username, 'username': self.username}
+
+    def _message(self, chat_id: int, **content: Any) -> dict:
+        return {
+            'message_id': self.api.next_message_id(chat_id),
+            'date': int(time()),
+            'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'supergroup'},
+            'from': self.user,
+            **content,
+        }
+
+    async def send_text(self, text: str, chat_id: int | None = None) -> None:
+        await self.api.push_update({'message': self._message(chat_id or self.user_id, text=text)})
+
+    async def send_album(self, size: int) -> None:
+        media_group_id = uuid4().hex
+        for _ in range(size):
+            file_id = f'bench{uuid4().hex}'
+            await self.api.push_update({'message': self._message(
+                self.user_id,
+                media_group_id=media_group_id,
+                photo=[{'file_id': file_id, 'file_unique_id': file_id, 'width': 1280, 'height': 720}],
+            )})
+
+    async def click(self, message: dict, data: str) -> None:
+        await self.api.push_update({'callback_query': {
+            'id': uuid4().hex,
+            'from': self.user,
+            'chat_instance': str(message['chat']['id']),
+            'message': {key: value for key, value in message.items() if key != 'deleted'},
+            'data': data,
+        }})
+
+
+def text_of(message: dict) -> str:
+    return message.get('text') or message.get('caption') or ''
+
+
+def order_button(message: dict, order_id: UUID, action: OrderActionEnum) -> str | None:
+    for row in (message.get('reply_markup') or {}).get('inline_keyboard', []):
+        for button in row:
+            data = button.get('callback_data') or ''
+            if not data.startswith(f'{OrderCallback.__prefix__}:'):
+                continue
+            callback = OrderCallback.unpack(data)
+            if callback.order_id == order_id and callback.action == action:
+                return data
+    return None
+
+
+class LoadGenerator:
+    def __init__(self, api: FakeBotApi, args: argparse.Namespace):
+        self.api = api
+        self.args = args
+        self.run_id = uuid4().hex[:6]
+        self.initiators: list[SimulatedUser] = []
+        self.inspectors: dict[int, SimulatedUser] = {}
+        self.payeers: asyncio.Queue[SimulatedUser] = asyncio.Queue()
+        self.payeer_chat_id = -1000000000000 - random.randrange(10 ** 6)
+        self.order_seconds: list[float] = []
+        self.failures: list[str] = []
+
+    async def seed(self) -> None:
+        user_ids = iter(range(10 ** 9 + random.randrange(10 ** 8), 2 * 10 ** 9))
+
+        async def add_user(role: UserRoleEnum) -> tuple[SimulatedUser, models.User]:
+            simulated = SimulatedUser(self.api, next(user_ids), '')
+            simulated.username = f'bench_{self.run_id}_{role.name.lower()}_{simulated.user_id}'
+            user = models.User(simulated.username, simulated.user_id)
+            await models.user.add_user(user=user)
+            await models.user_role.add_user_role(user_role=models.UserRole(user.id, role))
+            return simulated, user
+
+        inspectors = [await add_user(UserRoleEnum.INSPECTOR) for _ in range(self.args.inspectors)]
+        for i in range(self.args.initiators):
+            simulated, user = await add_user(UserRoleEnum.INITIATOR)
+            inspector, inspector_user = inspectors[i % len(inspectors)]
+            await models.relation.add_relation(relation=models.Relation(
+                id=uuid4(),
+                initiator_id=user.id,
+                first_inspector_id=inspector_user.id,
+                created_at=datetime.now(),
+            ))
+            self.initiators.append(simulated)
+            self.inspectors[simulated.user_id] = inspector
+        for _ in range(self.args.payeers):
+            simulated, _ = await add_user(UserRoleEnum.PAYEER)
+            self.payeers.put_nowait(simulated)
+        await config_store.replace_config(config=models.Config('payeer_chat_id', {'chat_id': self.payeer_chat_id}))
+
+    async def run_order(self, initiator: SimulatedUser, number: int) -> None:
+        api = self.api
+        chat_id = initiator.user_id
+        token = f'{self.run_id}-{initiator.user_id}-{number}'
+        since = api.last_message_id(chat_id)
+        fresh = lambda message: message['message_id'] > since
+        started_at = monotonic()
+
+        await initiator.send_text('/order')
+        await api.wait_for_message(chat_id, lambda m: fresh(m) and 'Отправьте описание' in text_of(m))
+        await initiator.send_text(f'Bench order {token}')
+        prompt = await api.wait_for_message(chat_id, lambda m: fresh(m) and 'Выберите валюту' in text_of(m))
+        await initiator.click(prompt, 'currency_USD')
+        await api.wait_for_message(chat_id, lambda m: fresh(m) and 'Укажите сумму' in text_of(m))
+        await initiator.send_text(str(random.randint(10, 1000)))
+        prompt = await api.wait_for_message(chat_id, lambda m: fresh(m) and 'Отправьте вложения' in text_of(m))
+        if self.args.files:
+            await initiator.send_album(self.args.files)
+        else:
+            await initiator.click(prompt, 'skip')
+        card = await api.wait_for_message(chat_id, lambda m: fresh(m) and token in text_of(m) and 'ID: ' in text_of(m))
+        order_id = UUID(ORDER_ID.search(text_of(card)).group(1))
+
+        inspector = self.inspectors[initiator.user_id]
+        keyboard = await api.wait_for_message(
+            inspector.user_id,
+            lambda m: order_button(m, order_id, OrderActionEnum.MARK_SUCCESS) is not None,
+        )
+        await inspector.click(keyboard, order_button(keyboard, order_id, OrderActionEnum.MARK_SUCCESS))
+
+        keyboard = await api.wait_for_message(
+            self.payeer_chat_id,
+            lambda m: order_button(m, order_id, OrderActionEnum.PAY_SUCCESS) is not None,
+        )
+        payeer = await self.payeers.get()
+        try:
+            await payeer.click(keyboard, order_button(keyboard, order_id, OrderActionEnum.PAY_SUCCESS))
+            order_message_id = keyboard['reply_to_message']['message_id']
+            prompt = await api.wait_for_message(
+                self.payeer_chat_id,
+                lambda m: 'Напишите описание' in text_of(m)
+                and m.get('reply_to_message', {}).get('message_id') == order_message_id,
+            )
+            await payeer.click(prompt, 'skip')
+            await api.wait_for_message(
+                chat_id,
+                lambda m: str(order_id) in text_of(m) and STATE_ENUM_TO_TEXT[OrderStateEnum.PAID] in text_of(m),
+            )
+        finally:
+            self.payeers.put_nowait(payeer)
+
+        self.order_seconds.append(monotonic() - started_at)
+
+    async def run_initiator(self, initiator: SimulatedUser) -> None:
+        for number in range(self.args.orders):
+            try:
+                await self.run_order(initiator, number)
+            except Exception as e:
+                self.failures.append(f'{initiator.username} #{number}: {type(e).__name__} {e}')
+
+
+def build_report(
+    generator: LoadGenerator,
+    timings: dict[str, list[float]],
+    api_calls: Counter[str],
+    elapsed: float,
+    floods: Counter[str],
+) -> dict:
+    completed = len(generator.order_seconds)
+    order_api_calls = sum(count for method, count in api_calls.items() if method != 'getUpdates')
+    return {
+        'orders_completed': completed,
+        'orders_failed': len(generator.failures),
+        'failures': generator.failures[:20],
+        'elapsed_seconds': round(elapsed, 3),
+        'orders_per_second': round(completed / elapsed, 3) if elapsed else 0,
+        'order_seconds': {
+            'p50': round(percentile(generator.order_seconds, 50), 4),
+            'p99': round(percentile(generator.order_seconds, 99), 4),
+        },
+        'handlers': {
+            name: {
+                'count': len(values),
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+            } for name, values in sorted(timings.items())
+        },
+        'api_calls_per_order': round(order_api_calls / completed, 2) if completed else None,
+        'api_calls': dict(sorted(api_calls.items())),
+        'flood_responses': dict(floods),
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"orders: {report['orders_completed']} completed, {report['orders_failed']} failed "
+          f"in {report['elapsed_seconds']} s ({report['orders_per_second']} orders/s)")
+    print(f"order latency: p50 {report['order_seconds']['p50']} s, p99 {report['order_seconds']['p99']} s")
+    print(f"Bot API calls per order: {report['api_calls_per_order']}")
+    print(f"{'handler':<48}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, stats in report['handlers'].items():
+        print(f"{name:<48}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p99_ms']:>10}")
+    print(f"{'api method':<48}{'calls':>8}")
+    for method, count in report['api_calls'].items():
+        print(f"{method:<48}{count:>8}")
+    for failure in report['failures']:
+        print(f'failed: {failure}')
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='End-to-end load test against a fake Bot API')
+    parser.add_argument('--initiators', type=int, default=10)
+    parser.add_argument('--inspectors', type=int, default=3)
+    parser.add_argument('--payeers', type=int, default=2)
+    parser.add_argument('--orders', type=int, default=3, help='orders per initiator')
+    parser.add_argument('--files', type=int, default=0, help='photos per order album, 0 to skip attachments')
+    parser.add_argument('--latency', type=float, default=0.03)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--flood-rate', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    api = FakeBotApi(latency=args.latency, jitter=args.jitter, flood_rate=args.flood_rate)
+    runner = await serve(api, '127.0.0.1', args.port)
+    base = f'http://127.0.0.1:{args.port}'
+
+    bot = Bot(
+        token='1:bench',
+        session=AiohttpSession(api=TelegramAPIServer.from_base(base)),
+        default=DefaultBotProperties(parse_mode='HTML'),
+    )
+    outbound_middleware = OutboundMiddleware(
+        workers=settings.outbound.workers,
+        global_rate=settings.outbound.global_rate,
+        chat_rate=settings.outbound.chat_rate,
+        group_rate=settings.outbound.group_rate,
+        burst=settings.outbound.burst,
+        max_retries=settings.outbound.max_retries,
+    )
+    bot.session.middleware(outbound_middleware)
+    bot.session.middleware(ApiMetricsMiddleware())
+    rate_provider.links = [f'{base}/rates/usd.json']
+
+    timings: dict[str, list[float]] = {}
+    dp = create_dispatcher(handler_timings=timings)
+    dp.startup.register(outbound_middleware.start)
+    dp.shutdown.register(outbound_middleware.close)
+    started = asyncio.Event()
+
+    async def on_started() -> None:
+        started.set()
+
+    dp.startup.register(on_started)
+
+    generator = LoadGenerator(api, args)
+    await generator.seed()
+
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=1))
+    waiter = asyncio.create_task(started.wait())
+    await asyncio.wait([polling, waiter], return_when=asyncio.FIRST_COMPLETED)
+    if polling.done():
+        waiter.cancel()
+        await polling
+    # setMyCommands, deleteWebhook and the like are not part of any order
+    startup_calls, startup_floods = api.calls.copy(), api.floods.copy()
+    started_at = monotonic()
+    try:
+        await asyncio.gather(*(generator.run_initiator(initiator) for initiator in generator.initiators))
+    finally:
+        elapsed = monotonic() - started_at
+        await dp.stop_polling()
+        await polling
+        await runner.cleanup()
+
+    report = build_report(generator, timings, api.calls - startup_calls, elapsed, api.floods - startup_floods)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
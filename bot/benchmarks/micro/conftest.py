@@ -0,0 +1,89 @@
+# pytest-benchmark suite for the hot helpers and the model layer.
+#
+#   make bench            # compare against the last saved baseline, fail on a 25% slowdown
+#   make bench-baseline   # save a new baseline to benchmarks/baselines/
+#
+# Uses the POSTGRES_* settings from .env. The model benchmarks create the tables
+# if needed and remove every row they add, but still point them at a local
+# database. Without a reachable Postgres they are skipped.
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.database import engine
+from core.models.models import Base
+
+
+BENCH_PREFIX = 'bench_'
+BENCH_BOT_ID = -1
+BENCH_PARTITION = -1
+
+BENCH_USERS = f"SELECT id FROM users WHERE tg_username LIKE '{BENCH_PREFIX}%'"
+BENCH_ORDERS = f'SELECT id FROM orders WHERE initiator_id IN ({BENCH_USERS})'
+
+CLEANUP = [
+    f'DELETE FROM messages WHERE order_id IN ({BENCH_ORDERS})',
+    f'DELETE FROM files WHERE order_id IN ({BENCH_ORDERS})',
+    f'DELETE FROM orders WHERE initiator_id IN ({BENCH_USERS})',
+    f'DELETE FROM relations WHERE initiator_id IN ({BENCH_USERS})',
+    f'DELETE FROM users_roles WHERE user_id IN ({BENCH_USERS})',
+    f"DELETE FROM users WHERE tg_username LIKE '{BENCH_PREFIX}%'",
+    f"DELETE FROM configs WHERE key LIKE '{BENCH_PREFIX}%'",
+    f'DELETE FROM fsm_states WHERE bot_id = {BENCH_BOT_ID}',
+    f'DELETE FROM update_queue WHERE partition = {BENCH_PARTITION}',
+]
+
+
+@pytest.fixture(scope='session')
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(engine.dispose())
+    loop.close()
+
+
+@pytest.fixture
+def run(loop):
+    return loop.run_until_complete
+
+
+@pytest.fixture
+def abenchmark(benchmark, loop):
+    def wrapper(function, *args, **kwargs):
+        return benchmark(lambda: loop.run_until_complete(function(*args, **kwargs)))
+    return wrapper
+
+
+@pytest.fixture
+def abenchmark_pedantic(benchmark, loop):
+    # setup() runs outside the timing and returns the (args, kwargs) of one call
+    def wrapper(function, setup, rounds=100):
+        return benchmark.pedantic(
+            lambda *args, **kwargs: loop.run_until_complete(function(*args, **kwargs)),
+            setup=setup,
+            rounds=rounds,
+        )
+    return wrapper
+
+
+async def cleanup():
+    async with engine.begin() as conn:
+        for statement in CLEANUP:
+            await conn.execute(text(statement))
+
+
+@pytest.fixture(scope='session')
+def database(loop):
+    async def prepare():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await cleanup()
+
+    try:
+        loop.run_until_complete(prepare())
+    except (OSError, SQLAlchemyError) as e:
+        pytest.skip(f'Postgres is not available: {e}')
+    yield
+    loop.run_until_complete(cleanup())
@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from aiogram.types import Chat, Message, PhotoSize
+
+from core import models
+from core.middlewares.media_group_middleware import MediaGroupMiddleware
+from core.utils.enums import FileMediaTypeEnum
+from core.utils.media_group import build_media_group
+
+
+MEDIA_TYPES = [FileMediaTypeEnum.PHOTO, FileMediaTypeEnum.VIDEO, FileMediaTypeEnum.DOCUMENT]
+
+
+@pytest.fixture
+def files():
+    order_id = uuid4()
+    return [
+        models.File(f'/data/files/{order_id}/{i}', MEDIA_TYPES[i % len(MEDIA_TYPES)], order_id, f'file_id_{i}')
+        for i in range(10)
+    ]
+
+
+def album(size: int) -> list[Message]:
+    return [
+        Message(
+            message_id=i,
+            date=datetime.now(),
+            chat=Chat(id=1, type='private'),
+            media_group_id='album',
+            photo=[PhotoSize(file_id=f'file_id_{i}', file_unique_id=f'unique_{i}', width=1280, height=720)],
+        )
+        for i in range(size)
+    ]
+
+
+@pytest.mark.parametrize('use_file_ids', [True, False], ids=['file_ids', 'upload'])
+def test_build_media_group(benchmark, files, use_file_ids):
+    media_group = benchmark(build_media_group, files, 'caption', use_file_ids)
+    assert len(media_group) == len(files)
+
+
+@pytest.mark.parametrize('size', [3, 10])
+def test_media_group_middleware(abenchmark, size):
+    # A full album flushes at once, a partial one on the next loop iteration with a zero delay
+    middleware = MediaGroupMiddleware(delay=0)
+    messages = album(size)
+
+    async def handler(event, data):
+        return data['album']
+
+    async def assemble():
+        results = await asyncio.gather(*(middleware(handler, message, {}) for message in messages))
+        return [result for result in results if result]
+
+    albums = abenchmark(assemble)
+    assert len(albums) == 1 and len(albums[0]) == size
@@ -0,0 +1,388 @@
+from datetime import datetime, timedelta
+from itertools import count
+from uuid import uuid4
+
+import pytest
+
+from core import models
+from core.database import assert_max_queries
+from core.utils.enums import FileMediaTypeEnum, MessageTypeEnum, OrderCurrencyEnum, OrderStateEnum, UserRoleEnum
+
+from .conftest import BENCH_BOT_ID, BENCH_PARTITION, BENCH_PREFIX
+
+
+pytestmark = pytest.mark.usefixtures('database')
+
+serial = count()
+
+
+def queries(limit: int, function):
+    # Fails the benchmark when a model function starts issuing more statements
+    async def wrapper(*args, **kwargs):
+        with assert_max_queries(limit):
+            return await function(*args, **kwargs)
+    return wrapper
+
+
+def new_user() -> models.User:
+    return models.User(f'{BENCH_PREFIX}{uuid4().hex[:12]}', 100000 + next(serial))
+
+
+def new_order(user: models.User) -> models.Order:
+    return models.Order(2, 1, OrderStateEnum.PENDING, user.id, 'description', 5000.0, OrderCurrencyEnum.USD)
+
+
+def new_messages(order: models.Order, size: int) -> list[models.Message]:
+    return [
+        models.Message(-100, 1000000 + next(serial), MessageTypeEnum.INITIATOR_MESSAGE, order.id)
+        for _ in range(size)
+    ]
+
+
+def new_files(order: models.Order, size: int) -> list[models.File]:
+    return [
+        models.File(f'/tmp/{BENCH_PREFIX}{uuid4()}', FileMediaTypeEnum.PHOTO, order.id, f'file_id_{next(serial)}')
+        for _ in range(size)
+    ]
+
+
+def new_fsm_state() -> models.FsmState:
+    return models.FsmState(
+        uuid4(),
+        BENCH_BOT_ID,
+        next(serial),
+        1,
+        'CreateOrderSteps:get_amount',
+        {'description': 'description', 'currency': 'USD', 'last_message_id': 1},
+        datetime.now() + timedelta(days=1),
+    )
+
+
+@pytest.fixture
+def user(run):
+    user = new_user()
+    run(models.user.add_user(user=user))
+    run(models.user_role.add_user_role(user_role=models.UserRole(user.id, UserRoleEnum.INITIATOR)))
+    return user
+
+
+@pytest.fixture
+def order(run, user):
+    order = new_order(user)
+    run(models.order.add_order(order=order))
+    return order
+
+
+@pytest.fixture
+def relation(run, user):
+    relation = models.Relation(id=uuid4(), initiator_id=user.id, first_inspector_id=user.id, created_at=datetime.now())
+    run(models.relation.add_relation(relation=relation))
+    return relation
+
+
+@pytest.fixture
+def messages(run, order):
+    messages = new_messages(order, 10)
+    run(models.message.add_messages(messages=messages))
+    return messages
+
+
+@pytest.fixture
+def files(run, order):
+    files = new_files(order, 10)
+    run(models.file.add_files(files=files))
+    return files
+
+
+@pytest.fixture
+def config(run):
+    config = models.Config(f'{BENCH_PREFIX}{uuid4().hex[:12]}', {'chat_id': 1})
+    run(models.config.replace_config(config=config))
+    return config
+
+
+@pytest.fixture
+def fsm_state(run):
+    fsm_state = new_fsm_state()
+    run(models.fsm_state.upsert_fsm_state(fsm_state=fsm_state, fields=['state', 'data']))
+    return fsm_state
+
+
+# users
+
+def test_add_user(abenchmark_pedantic):
+    abenchmark_pedantic(models.user.add_user, lambda: ((), {'user': new_user()}))
+
+
+def test_get_user_by_id(abenchmark, user):
+    assert abenchmark(models.user.get_user_by_id, id=user.id).id == user.id
+
+
+def test_get_user_by_tg_username(abenchmark, user):
+    assert abenchmark(queries(1, models.user.get_user_by_tg_username), tg_username=user.tg_username).id == user.id
+
+
+def test_get_all_users(abenchmark, user):
+    assert abenchmark(models.user.get_all_users)
+
+
+def test_update_user(abenchmark, user):
+    user.chat_id += 1
+    abenchmark(models.user.update_user, user=user)
+
+
+def test_delete_user(run, abenchmark_pedantic):
+    def setup():
+        user = new_user()
+        run(models.user.add_user(user=user))
+        return (), {'id': user.id}
+    abenchmark_pedantic(models.user.delete_user, setup)
+
+
+# user roles
+
+def test_add_user_role(abenchmark_pedantic, user):
+    abenchmark_pedantic(
+        models.user_role.add_user_role,
+        lambda: ((), {'user_role': models.UserRole(user.id, UserRoleEnum.INSPECTOR)}),
+    )
+
+
+def test_get_user_role_by_id(run, abenchmark, user):
+    user_role = run(models.user_role.get_user_roles_by_user_id(user_id=user.id))[0]
+    assert abenchmark(models.user_role.get_user_role_by_id, id=user_role.id).id == user_role.id
+
+
+def test_get_user_roles_by_user_id(abenchmark, user):
+    assert abenchmark(queries(1, models.user_role.get_user_roles_by_user_id), user_id=user.id)
+
+
+def test_get_all_users_roles(abenchmark, user):
+    assert abenchmark(models.user_role.get_all_users_roles)
+
+
+def test_update_user_role(run, abenchmark, user):
+    user_role = run(models.user_role.get_user_roles_by_user_id(user_id=user.id))[0]
+    abenchmark(models.user_role.update_user_role, user_role=user_role)
+
+
+def test_delete_user_role(run, abenchmark_pedantic, user):
+    def setup():
+        user_role = models.UserRole(user.id, UserRoleEnum.PAYEER)
+        run(models.user_role.add_user_role(user_role=user_role))
+        return (), {'id': user_role.id}
+    abenchmark_pedantic(models.user_role.delete_user_role, setup)
+
+
+# relations
+
+def test_add_relation(abenchmark_pedantic, user):
+    abenchmark_pedantic(
+        models.relation.add_relation,
+        lambda: ((), {'relation': models.Relation(id=uuid4(), initiator_id=user.id, created_at=datetime.now())}),
+    )
+
+
+def test_get_relation_by_initiator(abenchmark, relation):
+    assert abenchmark(queries(1, models.relation.get_relation_by_initiator), initiator_id=relation.initiator_id).id == relation.id
+
+
+def test_get_all_relations(abenchmark, relation):
+    assert abenchmark(models.relation.get_all_relations)
+
+
+def test_update_relation(abenchmark, relation):
+    abenchmark(models.relation.update_relation, relation=relation)
+
+
+def test_delete_relation(run, abenchmark_pedantic, user):
+    def setup():
+        relation = models.Relation(id=uuid4(), initiator_id=user.id, created_at=datetime.now())
+        run(models.relation.add_relation(relation=relation))
+        return (), {'id': relation.id}
+    abenchmark_pedantic(models.relation.delete_user, setup)
+
+
+# orders
+
+def test_add_order(abenchmark_pedantic, user):
+    abenchmark_pedantic(models.order.add_order, lambda: ((), {'order': new_order(user)}))
+
+
+def test_get_order_by_id(abenchmark, order):
+    assert abenchmark(models.order.get_order_by_id, id=order.id).id == order.id
+
+
+def test_get_all_orders(abenchmark, order):
+    assert abenchmark(models.order.get_all_orders)
+
+
+def test_update_order(abenchmark, order):
+    order.step = 2
+    abenchmark(models.order.update_order, order=order)
+
+
+# messages
+
+def test_add_message(abenchmark_pedantic, order):
+    abenchmark_pedantic(models.message.add_message, lambda: ((), {'message': new_messages(order, 1)[0]}))
+
+
+@pytest.mark.parametrize('size', [1, 10])
+def test_add_messages(abenchmark_pedantic, order, size):
+    abenchmark_pedantic(queries(1, models.message.add_messages), lambda: ((), {'messages': new_messages(order, size)}))
+
+
+def test_get_message(abenchmark, messages):
+    message = messages[-1]
+    assert abenchmark(models.message.get_message, message.chat_id, message.message_id).id == message.id
+
+
+def test_get_messages(abenchmark, order, messages):
+    assert len(abenchmark(queries(1, models.message.get_messages), order.id, MessageTypeEnum.INITIATOR_MESSAGE)) == len(messages)
+
+
+def test_delete_message(run, abenchmark_pedantic, order):
+    def setup():
+        message = new_messages(order, 1)[0]
+        run(models.message.add_message(message=message))
+        return (), {'id': message.id}
+    abenchmark_pedantic(models.message.delete_message, setup)
+
+
+def test_delete_messages_by_ids(run, abenchmark_pedantic, order):
+    def setup():
+        messages = new_messages(order, 10)
+        run(models.message.add_messages(messages=messages))
+        return (), {'ids': [message.id for message in messages]}
+    abenchmark_pedantic(queries(1, models.message.delete_messages_by_ids), setup)
+
+
+def test_delete_messages(run, abenchmark_pedantic, user):
+    def setup():
+        order = new_order(user)
+        run(models.order.add_order(order=order))
+        run(models.message.add_messages(messages=new_messages(order, 10)))
+        return (), {'order_id': order.id}
+    abenchmark_pedantic(models.message.delete_messages, setup)
+
+
+# files
+
+def test_add_file(abenchmark_pedantic, order):
+    abenchmark_pedantic(models.file.add_file, lambda: ((), {'file': new_files(order, 1)[0]}))
+
+
+@pytest.mark.parametrize('size', [1, 10])
+def test_add_files(abenchmark_pedantic, order, size):
+    abenchmark_pedantic(queries(1, models.file.add_files), lambda: ((), {'files': new_files(order, size)}))
+
+
+def test_get_order_files(abenchmark, order, files):
+    assert len(abenchmark(queries(1, models.file.get_order_files), order_id=order.id)) == len(files)
+
+
+def test_update_files_tg_file_id(abenchmark, files):
+    abenchmark(queries(1, models.file.update_files_tg_file_id), files=files)
+
+
+def test_delete_order_files(run, abenchmark_pedantic, user):
+    def setup():
+        order = new_order(user)
+        run(models.order.add_order(order=order))
+        run(models.file.add_files(files=new_files(order, 10)))
+        return (), {'order_id': order.id}
+    abenchmark_pedantic(models.file.delete_order_files, setup)
+
+
+# configs
+
+def test_get_config_by_key(abenchmark, config):
+    assert abenchmark(models.config.get_config_by_key, key=config.key).data == config.data
+
+
+def test_get_all_configs(abenchmark, config):
+    assert abenchmark(models.config.get_all_configs)
+
+
+def test_get_configs_by_keys(abenchmark, config):
+    assert abenchmark(queries(1, models.config.get_configs_by_keys), keys=[config.key])[0].data == config.data
+
+
+def test_get_config_versions(abenchmark, config):
+    assert config.key in abenchmark(queries(1, models.config.get_config_versions))
+
+
+def test_replace_config(abenchmark_pedantic, config):
+    abenchmark_pedantic(
+        queries(1, models.config.replace_config),
+        lambda: ((), {'config': models.Config(config.key, {'chat_id': next(serial)})}),
+    )
+
+
+def test_update_config(abenchmark, config):
+    abenchmark(models.config.update_config, config=models.Config(config.key, {'chat_id': 2}))
+
+
+# fsm states
+
+def test_get_fsm_state(abenchmark, fsm_state):
+    assert abenchmark(models.fsm_state.get_fsm_state, id=fsm_state.id).state == fsm_state.state
+
+
+@pytest.mark.parametrize('existing', [False, True], ids=['insert', 'update'])
+def test_upsert_fsm_state(abenchmark_pedantic, fsm_state, existing):
+    def setup():
+        state = new_fsm_state()
+        if existing:
+            state.id = fsm_state.id
+        return (), {'fsm_state': state, 'fields': ['state', 'data']}
+    abenchmark_pedantic(queries(1, models.fsm_state.upsert_fsm_state), setup)
+
+
+def test_delete_expired_fsm_states(abenchmark, fsm_state):
+    abenchmark(models.fsm_state.delete_expired_fsm_states)
+
+
+# update queue
+
+def new_queued_update() -> models.QueuedUpdate:
+    # Negative ids never collide with real Telegram updates
+    update_id = -1 - next(serial)
+    return models.QueuedUpdate(
+        update_id=update_id,
+        partition=BENCH_PARTITION,
+        payload={'update_id': update_id, 'message': {'message_id': 1, 'date': 0, 'chat': {'id': 1, 'type': 'private'}}},
+    )
+
+
+def test_add_update(abenchmark_pedantic):
+    abenchmark_pedantic(models.update_queue.add_update, lambda: ((), {'update': new_queued_update()}))
+
+
+def test_get_updates_by_partitions(run, abenchmark):
+    for _ in range(100):
+        run(models.update_queue.add_update(update=new_queued_update()))
+    updates = abenchmark(queries(1, models.update_queue.get_updates_by_partitions), partitions=[BENCH_PARTITION], limit=100)
+    assert len(updates) == 100
+
+
+def test_add_update_duplicate(run, abenchmark):
+    update = new_queued_update()
+    run(models.update_queue.add_update(update=update))
+    duplicate = new_queued_update()
+    duplicate.update_id = update.update_id
+    abenchmark(queries(1, models.update_queue.add_update), update=duplicate)
+
+
+def test_mark_updates_processed(run, abenchmark_pedantic):
+    def setup():
+        updates = [new_queued_update() for _ in range(10)]
+        for update in updates:
+            run(models.update_queue.add_update(update=update))
+        return (), {'ids': [update.id for update in updates]}
+    abenchmark_pedantic(queries(1, models.update_queue.mark_updates_processed), setup)
+
+
+def test_delete_processed_updates(abenchmark):
+    abenchmark(models.update_queue.delete_processed_updates, before=datetime.now())
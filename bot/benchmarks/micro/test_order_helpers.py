@@ -0,0 +1,63 @@
+from uuid import uuid4
+
+import pytest
+
+from core import models
+from core.utils.enums import OrderCurrencyEnum, OrderStateEnum
+from core.utils.exchange_rate import rate_provider
+from core.utils.get_order_level import get_order_level
+from core.utils.get_order_next_step import get_order_next_step
+from core.utils.get_order_text import get_order_text
+
+
+@pytest.fixture(autouse=True)
+def stub_rate(monkeypatch):
+    # The rate is normally refreshed over HTTP in the background, a fixed value keeps the call local
+    monkeypatch.setattr(rate_provider, 'rate', 90.0)
+
+
+@pytest.fixture
+def order():
+    return models.Order(
+        3,
+        1,
+        OrderStateEnum.CANCELED,
+        uuid4(),
+        'Оплата подрядчику за работы по договору',
+        25000.0,
+        OrderCurrencyEnum.USD,
+        reply='Нет закрывающих документов',
+    )
+
+
+@pytest.mark.parametrize('amount, currency, level', [
+    (1500, OrderCurrencyEnum.USD, 1),
+    (1500000, OrderCurrencyEnum.RUB, 2),
+    (50000, OrderCurrencyEnum.USD, 4),
+])
+def test_get_order_level(abenchmark, amount, currency, level):
+    assert abenchmark(get_order_level, amount, currency) == level
+
+
+@pytest.mark.parametrize('step, level, next_step', [
+    (0, 4, 1),
+    (1, 4, 3),
+    (3, 4, 5),
+])
+def test_get_order_next_step(benchmark, step, level, next_step):
+    relation = models.Relation(
+        id=uuid4(),
+        initiator_id=uuid4(),
+        first_inspector_id=uuid4(),
+        third_inspector_id=uuid4(),
+    )
+    assert benchmark(get_order_next_step, step, level, relation) == next_step
+
+
+@pytest.mark.parametrize('kwargs', [
+    {},
+    {'with_reply': True},
+    {'initiator_username': 'initiator'},
+], ids=['state', 'reply', 'initiator'])
+def test_get_order_text(benchmark, order, kwargs):
+    assert benchmark(get_order_text, order, **kwargs).startswith(f'ID: {order.id}\n')
@@ -0,0 +1,204 @@
+# Replays an update recording (RECORD_UPDATES_PATH, see UpdateRecorderMiddleware)
+# through the real dispatcher against the fake Bot API and a local Postgres, and
+# reports handler timings and SQL query counts. Run it on two commits and diff:
+#
+#   cd bot && python -m benchmarks.replay_updates updates.jsonl --speed 10 --output before.json
+#   git checkout <other commit>
+#   cd bot && python -m benchmarks.replay_updates updates.jsonl --speed 10 --compare before.json
+#
+# --speed 1 keeps the recorded pacing, higher values compress it, 0 sends
+# everything at once. --seed adds the recorded users with their recorded roles
+# to the database, so point the POSTGRES_* settings at a throwaway database.
+# Orders referenced by recorded callbacks don't exist locally, so those
+# handlers take their "already processed" branch on every commit alike.
+import argparse
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import TelegramObject, Update
+
+from benchmarks.fake_bot_api import FakeBotApi, serve
+from benchmarks.load_generator import percentile
+from core import models
+from core.database import count_queries, query_counter
+from core.middlewares.handler_metrics_middleware import handler_name
+from core.utils.enums import UserRoleEnum
+from core.utils.exchange_rate import rate_provider
+from main import create_dispatcher
+
+
+class ReplayStatsMiddleware(BaseMiddleware):
+    def __init__(self):
+        self.timings: Dict[str, list[float]] = defaultdict(list)
+        self.queries: Dict[str, list[int]] = defaultdict(list)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = handler_name(data.get("handler"))
+        counter = query_counter.get()
+        queries_before = counter.count if counter else 0
+        started_at = monotonic()
+        try:
+            return await handler(event, data)
+        finally:
+            self.timings[name].append(monotonic() - started_at)
+            self.queries[name].append(counter.count - queries_before if counter else 0)
+
+
+def load_records(path: str) -> list[dict]:
+    # Updates are written when handled, which is not always the order they arrived in
+    with open(path, encoding='utf-8') as f:
+        return sorted((json.loads(line) for line in f if line.strip()), key=lambda record: record['ts'])
+
+
+async def seed_users(records: list[dict]) -> None:
+    users: dict[str, tuple[int, set[str]]] = {}
+    for record in records:
+        update = record['update']
+        for event_type in ('message', 'callback_query'):
+            user = update.get(event_type, {}).get('from')
+            if user and user.get('username'):
+                users.setdefault(user['username'], (user['id'], set()))[1].update(record['roles'])
+
+    for username, (user_id, roles) in users.items():
+        if await models.user.get_user_by_tg_username(tg_username=username):
+            continue
+        user = models.User(username, user_id)
+        await models.user.add_user(user=user)
+        for role in roles:
+            await models.user_role.add_user_role(user_role=models.UserRole(user.id, UserRoleEnum(role)))
+
+
+async def replay(dp, bot: Bot, records: list[dict], speed: float) -> tuple[float, list[int]]:
+    update_totals: list[int] = []
+
+    async def feed(update: Update) -> None:
+        with count_queries() as counter:
+            try:
+                await dp.feed_update(bot, update)
+            except Exception:
+                logging.exception('Update %s failed', update.update_id)
+        update_totals.append(counter.count)
+
+    loop = asyncio.get_running_loop()
+    first_ts = records[0]['ts'] if records else 0
+    started_at = loop.time()
+    tasks = []
+    for record in records:
+        if speed:
+            delay = started_at + (record['ts'] - first_ts) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        update = Update.model_validate(record['update'], context={"bot": bot})
+        tasks.append(asyncio.create_task(feed(update)))
+    await asyncio.gather(*tasks)
+    return loop.time() - started_at, update_totals
+
+
+def build_report(stats: ReplayStatsMiddleware, api: FakeBotApi, elapsed: float, update_totals: list[int]) -> dict:
+    return {
+        'updates': len(update_totals),
+        'elapsed_seconds': round(elapsed, 3),
+        'queries_total': sum(update_totals),
+        'queries_per_update': round(sum(update_totals) / len(update_totals), 2) if update_totals else 0,
+        'handlers': {
+            name: {
+                'count': len(values),
+                'mean_ms': round(sum(values) / len(values) * 1000, 2),
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+                'queries_mean': round(sum(stats.queries[name]) / len(stats.queries[name]), 2),
+            } for name, values in sorted(stats.timings.items())
+        },
+        'api_calls': dict(sorted(api.calls.items())),
+    }
+
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return ''
+    return f'{(after - before) / before * 100:+.1f}%'
+
+
+def print_report(report: dict, baseline: dict | None = None) -> None:
+    print(f"updates: {report['updates']} in {report['elapsed_seconds']} s, "
+          f"{report['queries_total']} queries ({report['queries_per_update']} per update)")
+    if baseline:
+        print(f"baseline: {baseline['queries_total']} queries ({baseline['queries_per_update']} per update)")
+    print(f"{'handler':<48}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}{'queries':>9}")
+    for name, stats in report['handlers'].items():
+        print(f"{name:<48}{stats['count']:>7}{stats['p50_ms']:>10}{stats['p99_ms']:>10}{stats['queries_mean']:>9}")
+        before = (baseline or {}).get('handlers', {}).get(name)
+        if before:
+            print(f"{'  vs baseline':<48}{'':>7}"
+                  f"{change(before['p50_ms'], stats['p50_ms']):>10}"
+                  f"{change(before['p99_ms'], stats['p99_ms']):>10}"
+                  f"{change(before['queries_mean'], stats['queries_mean']):>9}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Replay recorded updates and report handler timings')
+    parser.add_argument('recording', help='JSONL file written by UpdateRecorderMiddleware')
+    parser.add_argument('--speed', type=float, default=1.0, help='1 = recorded pacing, 0 = as fast as possible')
+    parser.add_argument('--seed', action='store_true', help='add recorded users and roles to the database')
+    parser.add_argument('--latency', type=float, default=0.03)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    parser.add_argument('--compare', help='baseline report to diff against')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    records = load_records(args.recording)
+    if args.seed:
+        await seed_users(records)
+
+    api = FakeBotApi(latency=args.latency, jitter=args.jitter)
+    runner = await serve(api, '127.0.0.1', args.port)
+    base = f'http://127.0.0.1:{args.port}'
+    bot = Bot(
+        token='1:replay',
+        session=AiohttpSession(api=TelegramAPIServer.from_base(base)),
+        default=DefaultBotProperties(parse_mode='HTML'),
+    )
+    rate_provider.links = [f'{base}/rates/usd.json']
+
+    dp = create_dispatcher()
+    stats = ReplayStatsMiddleware()
+    dp.message.middleware(stats)
+    dp.callback_query.middleware(stats)
+
+    workflow_data = {"dispatcher": dp, "bot": bot, **dp.workflow_data}
+    await dp.emit_startup(**workflow_data)
+    try:
+        elapsed, update_totals = await replay(dp, bot, records, args.speed)
+    finally:
+        await dp.emit_shutdown(**workflow_data)
+        await bot.session.close()
+        await runner.cleanup()
+
+    report = build_report(stats, api, elapsed, update_totals)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,16 +1,213 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import asyncio
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import monotonic
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from core.settings import settings
+from core.utils.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_WAIT_SECONDS,
+    DB_QUERIES,
+    DB_QUERY_SECONDS,
+    DB_SLOW_QUERIES,
+)
 
 
-engine = create_async_engine(url=settings.database.url)
+MAX_LOGGED_PARAMETERS = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        started_at = monotonic()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(monotonic() - started_at)
+
+
+engine = create_async_engine(
+    url=settings.database.url,
+    poolclass=InstrumentedPool,
+    pool_size=settings.database.pool_size,
+    max_overflow=settings.database.max_overflow,
+    pool_timeout=settings.database.pool_timeout,
+    pool_recycle=settings.database.pool_recycle,
+    pool_pre_ping=settings.database.pool_pre_ping,
+    connect_args={'prepared_statement_cache_size': settings.database.statement_cache_size},
+)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
+current_session: ContextVar[AsyncSession | None] = ContextVar('current_session', default=None)
+
+
+class QueryCounter:
+    def __init__(self, parent: 'QueryCounter | None' = None):
+        self.parent = parent
+        self.count = 0
+        self.handler: str | None = parent.handler if parent else None
+
+    def add(self) -> None:
+        counter = self
+        while counter is not None:
+            counter.count += 1
+            counter = counter.parent
+
+
+query_counter: ContextVar[QueryCounter | None] = ContextVar('query_counter', default=None)
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter(query_counter.get())
+    token = query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        query_counter.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    with count_queries() as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(f'Expected at most {limit} queries, {counter.count} were executed')
+
+
+def set_query_handler(name: str) -> None:
+    counter = query_counter.get()
+    while counter is not None:
+        counter.handler = name
+        counter = counter.parent
+
+
+@event.listens_for(engine.sync_engine, 'checkout')
+@event.listens_for(engine.sync_engine, 'checkin')
+def update_pool_metrics(*args):
+    DB_POOL_CHECKED_OUT.set(engine.pool.checkedout())
+    DB_POOL_OVERFLOW.set(max(engine.pool.overflow(), 0))
+
+
+@event.listens_for(engine.sync_engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.query_started_at = monotonic()
+
+
+@event.listens_for(engine.sync_engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = monotonic() - context.query_started_at
+    kind = statement.lstrip().split(None, 1)[0].upper()
+    DB_QUERIES.labels(kind).inc()
+    DB_QUERY_SECONDS.labels(kind).observe(elapsed)
+
+    counter = query_counter.get()
+    if counter is not None:
+        counter.add()
+    slow_query_ms = settings.database.slow_query_ms
+    if slow_query_ms and elapsed * 1000 >= slow_query_ms:
+        handler = counter.handler if counter and counter.handler else '-'
+        DB_SLOW_QUERIES.labels(handler).inc()
+        logger.warning(
+            'Slow query in %s (%.1f ms): %s; parameters: %s',
+            handler, elapsed * 1000, ' '.join(statement.split()), repr(parameters)[:MAX_LOGGED_PARAMETERS],
+        )
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def track_orm_writes(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info['has_writes'] = True
+
+
+@event.listens_for(Session, 'after_flush')
+def track_flush_writes(session, flush_context):
+    session.info['has_writes'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def run_after_commit(session):
+    session.info.pop('has_writes', None)
+    for callback in session.info.pop('after_commit', []):
+        callback()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_after_commit(session, previous_transaction):
+    session.info.pop('has_writes', None)
+    session.info.pop('after_commit', None)
+
+
+def after_commit(callback, session: AsyncSession | None = None) -> None:
+    session = session or current_session.get()
+    if session is None:
+        # Outside a unit of work every write is committed before it returns
+        callback()
+        return
+    session.info.setdefault('after_commit', []).append(callback)
+
+
+async def release_connection(session: AsyncSession) -> None:
+    # Ends a transaction that has only read, so its pooled connection goes back to the pool.
+    # The session stays usable and the owner still commits whatever is written later
+    if not session.info.get('has_writes'):
+        await session.rollback()
+
+
+async def commit_writes(session: AsyncSession) -> None:
+    # Called before a message goes out, so Telegram never shows a change that can still be rolled back
+    if session.info.get('has_writes'):
+        await session.commit()
+
+
+async def warm_pool(count: int) -> None:
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+
+    await asyncio.gather(*(ping() for _ in range(min(count, settings.database.pool_size))))
+
+
+@asynccontextmanager
+async def unit_of_work():
+    async with async_session_maker() as session:
+        token = current_session.set(session)
+        try:
+            yield session
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            raise e
+        finally:
+            current_session.reset(token)
+
 
 def connection(method):
+    @wraps(method)
     async def wrapper(*args, **kwargs):
+        session = kwargs.pop('session', None) or current_session.get()
+        if session is not None:
+            # Inside a unit of work: keep statement order and detach what this helper loaded,
+            # leave the commit to the owner of the session
+            loaded = set(session.identity_map.keys())
+            result = await method(*args, session=session, **kwargs)
+            await session.flush()
+            for key in session.identity_map.keys() - loaded:
+                session.expunge(session.identity_map[key])
+            return result
+
         async with async_session_maker() as session:
             try:
-                return await method(*args, session=session, **kwargs)
+                result = await method(*args, session=session, **kwargs)
+                await session.commit()
+                return result
             except Exception as e:
                 await session.rollback()
                 raise e
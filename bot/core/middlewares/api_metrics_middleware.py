@@ -0,0 +1,25 @@
+from time import monotonic
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from core.utils.metrics import BOT_API_ERRORS, BOT_API_SECONDS
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started_at = monotonic()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            BOT_API_ERRORS.labels(method.__api_method__, type(e).__name__).inc()
+            raise
+        finally:
+            BOT_API_SECONDS.labels(method.__api_method__).observe(monotonic() - started_at)
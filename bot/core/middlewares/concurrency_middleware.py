@@ -0,0 +1,75 @@
+import asyncio
+from contextlib import AsyncExitStack
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from core.utils.metrics import UPDATES_IN_FLIGHT, UPDATES_SHED, UPDATES_WAITING, UPDATE_WAIT_SECONDS
+
+
+LANE_CALLBACKS = 'callbacks'
+LANE_MEDIA = 'media'
+LANE_MESSAGES = 'messages'
+
+OVERLOAD_TEXT = 'Сейчас бот перегружен. Повторите через минуту.'
+
+
+class ConcurrencyMiddleware(BaseMiddleware):
+    def __init__(
+        self,
+        global_limit: int,
+        lane_limits: Dict[str, int],
+        shed_threshold: int,
+    ):
+        self.global_semaphore = asyncio.Semaphore(global_limit)
+        self.lane_semaphores = {lane: asyncio.Semaphore(limit) for lane, limit in lane_limits.items()}
+        self.shed_threshold = shed_threshold
+        self.waiting = {lane: 0 for lane in lane_limits}
+
+    def get_lane(self, event: Update) -> str:
+        if event.callback_query:
+            return LANE_CALLBACKS
+        message = event.message
+        if message and (message.media_group_id or message.document or message.photo or message.video):
+            return LANE_MEDIA
+        return LANE_MESSAGES
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        lane = self.get_lane(event)
+        lane_semaphore = self.lane_semaphores[lane]
+
+        if (lane_semaphore.locked() or self.global_semaphore.locked()) and self.waiting[lane] >= self.shed_threshold:
+            UPDATES_SHED.labels(lane).inc()
+            await self.reject(event)
+            return
+
+        self.waiting[lane] += 1
+        UPDATES_WAITING.labels(lane).set(self.waiting[lane])
+        started_at = monotonic()
+        async with AsyncExitStack() as stack:
+            try:
+                await stack.enter_async_context(lane_semaphore)
+                await stack.enter_async_context(self.global_semaphore)
+            finally:
+                self.waiting[lane] -= 1
+                UPDATES_WAITING.labels(lane).set(self.waiting[lane])
+            UPDATE_WAIT_SECONDS.labels(lane).observe(monotonic() - started_at)
+
+            UPDATES_IN_FLIGHT.labels(lane).inc()
+            try:
+                return await handler(event, data)
+            finally:
+                UPDATES_IN_FLIGHT.labels(lane).dec()
+
+    async def reject(self, event: Update) -> None:
+        if event.callback_query:
+            await event.callback_query.answer(OVERLOAD_TEXT, show_alert=True)
+        elif event.message:
+            await event.message.answer(OVERLOAD_TEXT)
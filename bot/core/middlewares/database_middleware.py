@@ -0,0 +1,39 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from core.database import count_queries, unit_of_work
+from core.settings import settings
+from core.utils.metrics import DB_UPDATE_QUERIES
+
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        with count_queries() as counter:
+            try:
+                async with unit_of_work() as session:
+                    data["session"] = session
+                    return await handler(event, data)
+            finally:
+                self.check_budget(event, counter.handler, counter.count)
+
+    def check_budget(self, event: Update, handler: str | None, count: int) -> None:
+        if not count:
+            return
+        DB_UPDATE_QUERIES.labels(handler or '-').observe(count)
+        budget = settings.database.query_budget
+        if budget and count > budget:
+            logger.warning(
+                'Update %s handled by %s ran %s queries, the budget is %s',
+                event.update_id, handler or '-', count, budget,
+            )
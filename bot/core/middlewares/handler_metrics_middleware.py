@@ -0,0 +1,43 @@
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject
+
+from core.database import set_query_handler
+from core.utils.metrics import HANDLER_ERRORS, HANDLER_SECONDS
+
+
+def handler_name(handler_object: HandlerObject | None) -> str:
+    # Module path keeps handlers with the same function name apart, e.g. inspector and payeer reply_order
+    if handler_object is None:
+        return 'unknown'
+    callback = handler_object.callback
+    return f"{callback.__module__.removeprefix('core.modules.')}.{callback.__qualname__}"
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    def __init__(self, timings: Dict[str, list[float]] | None = None):
+        # The load generator passes a dict to get raw samples for exact percentiles
+        self.timings = timings
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = handler_name(data.get("handler"))
+        set_query_handler(name)
+        started_at = monotonic()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.labels(name).inc()
+            raise
+        finally:
+            elapsed = monotonic() - started_at
+            HANDLER_SECONDS.labels(name).observe(elapsed)
+            if self.timings is not None:
+                self.timings.setdefault(name, []).append(elapsed)
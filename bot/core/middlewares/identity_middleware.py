@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TelegramUser
+
+from core import models
+from core.settings import settings
+from core.utils.identity import Identity, identity_cache
+
+
+async def resolve_identity(tg_username: str) -> Identity:
+    identity = identity_cache.get(tg_username)
+    if identity is not None:
+        return identity
+
+    user = await models.user.get_user_by_tg_username(tg_username=tg_username)
+    roles = frozenset()
+    if user:
+        user_roles = await models.user_role.get_user_roles_by_user_id(user_id=user.id)
+        roles = frozenset(user_role.role for user_role in user_roles)
+    identity = Identity(user=user, roles=roles, version=user.version if user else None)
+    identity_cache.set(tg_username, identity)
+    return identity
+
+
+class IdentityWatcher:
+    # Evicts cached identities whose users.version moved, so role changes made by the admin panel
+    # or another replica apply within a poll interval instead of the cache TTL
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh(self) -> None:
+        cached = dict(identity_cache.items())
+        if not cached:
+            return
+        versions = await models.user.get_user_versions(tg_usernames=list(cached))
+        for tg_username, identity in cached.items():
+            if versions.get(tg_username) != identity.version:
+                identity_cache.pop(tg_username)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logging.exception('Identity refresh failed')
+
+
+identity_watcher = IdentityWatcher(poll_interval=settings.cache.identity_poll_interval)
+
+
+class IdentityMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        from_user: TelegramUser | None = data.get("event_from_user")
+        identity = Identity(user=None, roles=frozenset())
+        if from_user and from_user.username:
+            identity = await resolve_identity(from_user.username)
+
+        data["user"] = identity.user
+        data["roles"] = identity.roles
+        return await handler(event, data)
@@ -1,4 +1,6 @@
 import asyncio
+from collections import OrderedDict
+from time import monotonic
 from typing import Any, Awaitable, Callable, Dict, List, Union
 
 from aiogram import BaseMiddleware
@@ -7,15 +9,49 @@ from aiogram.types import (
     TelegramObject,
 )
 
+from core.utils.metrics import ALBUM_ASSEMBLY_SECONDS, ALBUM_FLUSHES, ALBUM_LATE_ITEMS, ALBUM_SIZE, ALBUMS_PENDING
+from core.utils.ttl_cache import TTLCache
+
 
 DEFAULT_DELAY = 0.6
+DEFAULT_MAX_PENDING = 256
+MEDIA_GROUP_MAX_SIZE = 10
+FLUSHED_TTL = 60
 
 
-class MediaGroupMiddleware(BaseMiddleware):
-    ALBUM_DATA: Dict[str, List[Message]] = {}
+class Album:
+    def __init__(self, message: Message):
+        self.messages: List[Message] = [message]
+        self.started_at = monotonic()
+        self.ready = asyncio.Event()
+        self.reason = 'timeout'
+        self.timer: asyncio.TimerHandle | None = None
+
+    def schedule(self, delay: float) -> None:
+        if self.timer:
+            self.timer.cancel()
+        self.timer = asyncio.get_running_loop().call_later(delay, self.flush, 'timeout')
 
-    def __init__(self, delay: Union[int, float] = DEFAULT_DELAY):
+    def flush(self, reason: str) -> None:
+        if self.ready.is_set():
+            return
+        if self.timer:
+            self.timer.cancel()
+        self.reason = reason
+        self.ready.set()
+
+
+class MediaGroupMiddleware(BaseMiddleware):
+    def __init__(
+        self,
+        delay: Union[int, float] = DEFAULT_DELAY,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
         self.delay = delay
+        self.max_pending = max_pending
+        self.albums: OrderedDict[str, Album] = OrderedDict()
+        # A late item of an album that was already handed over would otherwise start a second order
+        self.flushed = TTLCache(maxsize=max_pending * MEDIA_GROUP_MAX_SIZE, ttl=FLUSHED_TTL)
 
     async def __call__(
         self,
@@ -26,12 +62,40 @@ class MediaGroupMiddleware(BaseMiddleware):
         if not event.media_group_id:
             return await handler(event, data)
 
-        try:
-            self.ALBUM_DATA[event.media_group_id].append(event)
+        album = self.albums.get(event.media_group_id)
+        if album and not album.ready.is_set():
+            album.messages.append(event)
+            self.albums.move_to_end(event.media_group_id)
+            if len(album.messages) >= MEDIA_GROUP_MAX_SIZE:
+                album.flush('full')
+            else:
+                album.schedule(self.delay)
             return  # Don't propagate the event
-        except KeyError:
-            self.ALBUM_DATA[event.media_group_id] = [event]
-            await asyncio.sleep(self.delay)
-            data["album"] = self.ALBUM_DATA.pop(event.media_group_id)
+        if album or self.flushed.get(event.media_group_id):
+            ALBUM_LATE_ITEMS.inc()
+            return
+
+        album = Album(event)
+        self.albums[event.media_group_id] = album
+        while len(self.albums) > self.max_pending:
+            media_group_id, oldest = self.albums.popitem(last=False)
+            oldest.flush('evicted')
+            self.flushed.set(media_group_id, True)
+        ALBUMS_PENDING.set(len(self.albums))
+
+        try:
+            album.schedule(self.delay)
+            await album.ready.wait()
+        finally:
+            album.flush('cancelled')
+            self.flushed.set(event.media_group_id, True)
+            if self.albums.get(event.media_group_id) is album:
+                del self.albums[event.media_group_id]
+            ALBUMS_PENDING.set(len(self.albums))
+
+        ALBUM_ASSEMBLY_SECONDS.observe(monotonic() - album.started_at)
+        ALBUM_FLUSHES.labels(album.reason).inc()
+        ALBUM_SIZE.observe(len(album.messages))
+        data["album"] = sorted(album.messages, key=lambda message: message.message_id)
 
-        return await handler(event, data)
\ No newline at end of file
+        return await handler(event, data)
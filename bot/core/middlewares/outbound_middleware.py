@@ -0,0 +1,244 @@
+import asyncio
+import heapq
+import logging
+from itertools import count
+from time import monotonic
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, Response, SendMediaGroup, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from core.database import commit_writes, current_session, release_connection
+from core.utils.metrics import OUTBOUND_QUEUE_DEPTH, OUTBOUND_RETRIES, OUTBOUND_SEND_SECONDS
+from core.utils.token_bucket import TokenBucket
+from core.utils.ttl_cache import TTLCache
+
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+METHOD_PRIORITY = {
+    'answerCallbackQuery': PRIORITY_HIGH,
+    'deleteMessage': PRIORITY_HIGH,
+    'deleteMessages': PRIORITY_HIGH,
+    'editMessageText': PRIORITY_HIGH,
+    'editMessageReplyMarkup': PRIORITY_HIGH,
+    'sendMediaGroup': PRIORITY_LOW,
+    'sendDocument': PRIORITY_LOW,
+    'sendPhoto': PRIORITY_LOW,
+    'sendVideo': PRIORITY_LOW,
+}
+
+
+# Per-chat limits count sent messages, edits and deletes of already sent ones don't wait for chat tokens
+CHAT_LIMITED_PREFIXES = ('send', 'copyMessage', 'forwardMessage')
+
+
+def is_chat_limited(method: TelegramMethod) -> bool:
+    api_method = method.__api_method__
+    return api_method.startswith(CHAT_LIMITED_PREFIXES) and api_method != 'sendChatAction'
+
+
+class ChatQueue:
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.calls: list['OutboundCall'] = []
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class OutboundCall:
+    def __init__(
+        self,
+        priority: int,
+        sequence: int,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        chat: ChatQueue | None,
+    ):
+        self.priority = priority
+        self.sequence = sequence
+        self.make_request = make_request
+        self.bot = bot
+        self.method = method
+        self.chat = chat
+        # Telegram counts every message of an album against the limits
+        self.cost = len(method.media) if isinstance(method, SendMediaGroup) else 1
+        self.chat_limited = chat is not None and is_chat_limited(method)
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = monotonic()
+        self.attempt = 0
+
+    def __lt__(self, other: 'OutboundCall') -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class OutboundMiddleware(BaseRequestMiddleware):
+    def __init__(
+        self,
+        workers: int,
+        global_rate: float,
+        chat_rate: float,
+        group_rate: float,
+        burst: int,
+        max_retries: int,
+    ):
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(rate=global_rate, capacity=global_rate)
+        self.chats = TTLCache(maxsize=10000, ttl=600)
+        self._ready: asyncio.PriorityQueue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._sequence = count()
+        self._pending = 0
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        # Only calls that produce chat traffic are rate limited, getUpdates and friends go straight through.
+        # Before startup there are no workers yet, so those calls are sent directly too
+        if not hasattr(method, 'chat_id') and not isinstance(method, AnswerCallbackQuery):
+            return await make_request(bot, method)
+        session = current_session.get()
+        if session is not None:
+            await commit_writes(session)
+        if self._ready is None:
+            return await make_request(bot, method)
+
+        call = OutboundCall(
+            METHOD_PRIORITY.get(method.__api_method__, PRIORITY_NORMAL),
+            next(self._sequence),
+            make_request,
+            bot,
+            method,
+            self._chat(getattr(method, 'chat_id', None)),
+        )
+        self._pending += 1
+        OUTBOUND_QUEUE_DEPTH.set(self._pending)
+        self._submit(call)
+        # A call waiting for chat tokens can take seconds, a read-only transaction gives its connection back meanwhile
+        if session is not None and call.chat_limited and call.chat.timer is not None:
+            await release_connection(session)
+        return await call.future
+
+    async def start(self) -> None:
+        # Started from the dispatcher startup, so workers don't inherit the context of the first update
+        self._ready = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        ready, self._ready = self._ready, None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Fail everything still queued, so handlers awaiting a send don't hang on shutdown
+        calls = []
+        while ready is not None and not ready.empty():
+            calls.append(ready.get_nowait())
+        for chat in self.chats.values():
+            if chat.timer is not None:
+                chat.timer.cancel()
+                chat.timer = None
+            calls.extend(chat.calls)
+            chat.calls = []
+        self.chats.clear()
+        for call in calls:
+            self._fail(call)
+
+    def _chat(self, chat_id: int | str | None) -> ChatQueue | None:
+        if chat_id is None:
+            return None
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            # Debt is capped at zero, so after an album the next message waits for one token, not for the whole album
+            chat = ChatQueue(TokenBucket(
+                rate=self.group_rate if is_group else self.chat_rate,
+                capacity=self.burst,
+                max_debt=0,
+            ))
+        # Re-set on every use so active chats are never evicted by the TTL
+        self.chats.set(chat_id, chat)
+        return chat
+
+    def _submit(self, call: OutboundCall) -> None:
+        if self._ready is None:
+            self._fail(call)
+            return
+        if not call.chat_limited:
+            self._ready.put_nowait(call)
+            return
+        heapq.heappush(call.chat.calls, call)
+        if call.chat.timer is None:
+            self._schedule(call.chat)
+
+    def _schedule(self, chat: ChatQueue) -> None:
+        # Calls wait in their chat's queue until the chat has tokens, only then a worker picks them up.
+        # A busy chat therefore never holds a worker while other chats and callback answers wait
+        chat.timer = None
+        while chat.calls and self._ready is not None:
+            if chat.calls[0].future.done():
+                self._done(heapq.heappop(chat.calls))
+                continue
+            wait = chat.bucket.try_acquire(chat.calls[0].cost)
+            if wait:
+                chat.timer = asyncio.get_running_loop().call_later(wait, self._schedule, chat)
+                return
+            self._ready.put_nowait(heapq.heappop(chat.calls))
+
+    async def _worker(self) -> None:
+        ready = self._ready
+        while True:
+            call: OutboundCall = await ready.get()
+            if call.future.done():
+                self._done(call)
+                continue
+            try:
+                await self.global_bucket.acquire(call.cost)
+                result = await call.make_request(call.bot, call.method)
+            except asyncio.CancelledError:
+                self._fail(call)
+                raise
+            except TelegramRetryAfter as e:
+                if call.attempt >= self.max_retries:
+                    if not call.future.done():
+                        call.future.set_exception(e)
+                    self._done(call)
+                    continue
+                call.attempt += 1
+                OUTBOUND_RETRIES.labels(call.method.__api_method__).inc()
+                logging.warning('Flood control on %s, retrying in %s s', call.method.__api_method__, e.retry_after)
+                (call.chat.bucket if call.chat else self.global_bucket).pause(e.retry_after)
+                if call.chat_limited:
+                    self._submit(call)
+                else:
+                    # Edits and deletes skip the chat queue, so they wait out the pause here
+                    asyncio.get_running_loop().call_later(e.retry_after, self._submit, call)
+                continue
+            except Exception as e:
+                if not call.future.done():
+                    call.future.set_exception(e)
+            else:
+                if not call.future.done():
+                    call.future.set_result(result)
+            self._done(call)
+
+    def _fail(self, call: OutboundCall) -> None:
+        if not call.future.done():
+            call.future.set_exception(RuntimeError('Outbound queue is closed'))
+        self._done(call)
+
+    def _done(self, call: OutboundCall) -> None:
+        self._pending -= 1
+        OUTBOUND_QUEUE_DEPTH.set(self._pending)
+        OUTBOUND_SEND_SECONDS.labels(call.method.__api_method__).observe(monotonic() - call.enqueued_at)
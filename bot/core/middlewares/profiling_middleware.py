@@ -0,0 +1,19 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from core.middlewares.handler_metrics_middleware import handler_name
+from core.utils.profiler import profiler
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not profiler.enabled:
+            return await handler(event, data)
+        return await profiler.profile(handler_name(data.get("handler")), handler, event, data)
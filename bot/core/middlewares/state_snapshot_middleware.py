@@ -0,0 +1,134 @@
+from copy import deepcopy
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, cast
+
+from aiogram import Bot
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import DEFAULT_DESTINY, StateType, StorageKey
+from aiogram.types import TelegramObject
+
+from core.utils.metrics import FSM_STORAGE_SECONDS
+
+
+class SnapshotFSMContext(FSMContext):
+
+    def __init__(self, storage, key: StorageKey) -> None:
+        super().__init__(storage=storage, key=key)
+        self._state: Optional[str] = None
+        self._data: Dict[str, Any] = {}
+        self._state_changed = False
+        self._data_replaced = False
+        self._changed_keys: set[str] = set()
+
+    @property
+    def _dirty(self) -> bool:
+        return self._state_changed or self._data_replaced or bool(self._changed_keys)
+
+    async def load(self) -> None:
+        started_at = monotonic()
+        if hasattr(self.storage, 'get_record'):
+            self._state, self._data = await self.storage.get_record(self.key)
+        else:
+            self._state = await self.storage.get_state(self.key)
+            self._data = await self.storage.get_data(self.key)
+        self._state_changed = self._data_replaced = False
+        self._changed_keys = set()
+        FSM_STORAGE_SECONDS.labels('load').observe(monotonic() - started_at)
+
+    async def flush(self) -> None:
+        if not self._dirty:
+            return
+        started_at = monotonic()
+        # The snapshot is loaded before the update waits for a handler slot, so write
+        # back only what this update changed instead of the whole snapshot
+        if self._data_replaced:
+            changes = self._data
+        else:
+            changes = {key: self._data[key] for key in self._changed_keys}
+        if hasattr(self.storage, 'write_changes'):
+            await self.storage.write_changes(
+                self.key, self._state, changes,
+                state_changed=self._state_changed,
+                data_replaced=self._data_replaced,
+            )
+        else:
+            if self._state_changed:
+                await self.storage.set_state(self.key, self._state)
+            if self._data_replaced:
+                await self.storage.set_data(self.key, changes)
+            elif changes:
+                await self.storage.update_data(self.key, changes)
+        self._state_changed = self._data_replaced = False
+        self._changed_keys = set()
+        FSM_STORAGE_SECONDS.labels('flush').observe(monotonic() - started_at)
+
+    async def set_state(self, state: StateType = None) -> None:
+        self._state = state.state if isinstance(state, State) else state
+        self._state_changed = True
+
+    async def get_state(self) -> Optional[str]:
+        return self._state
+
+    async def set_data(self, data: Mapping[str, Any]) -> None:
+        self._data = deepcopy(dict(data))
+        self._data_replaced = True
+        self._changed_keys = set()
+
+    async def get_data(self) -> Dict[str, Any]:
+        return deepcopy(self._data)
+
+    async def get_value(self, key: str, default: Optional[Any] = None) -> Optional[Any]:
+        return deepcopy(self._data.get(key, default))
+
+    async def update_data(
+        self, data: Optional[Mapping[str, Any]] = None, **kwargs: Any
+    ) -> Dict[str, Any]:
+        if data:
+            kwargs.update(data)
+        self._data.update(deepcopy(kwargs))
+        self._changed_keys.update(kwargs)
+        return deepcopy(self._data)
+
+
+class StateSnapshotMiddleware(FSMContextMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        bot: Bot = cast(Bot, data["bot"])
+        context = self.resolve_event_context(bot, data)
+        data["fsm_storage"] = self.storage
+        if context is None:
+            return await handler(event, data)
+
+        async with self.events_isolation.lock(key=context.key):
+            await context.load()
+            data.update({"state": context, "raw_state": await context.get_state()})
+            result = await handler(event, data)
+            await context.flush()
+            return result
+
+    def get_context(
+        self,
+        bot: Bot,
+        chat_id: int,
+        user_id: int,
+        thread_id: Optional[int] = None,
+        business_connection_id: Optional[str] = None,
+        destiny: str = DEFAULT_DESTINY,
+    ) -> SnapshotFSMContext:
+        return SnapshotFSMContext(
+            storage=self.storage,
+            key=StorageKey(
+                user_id=user_id,
+                chat_id=chat_id,
+                bot_id=bot.id,
+                thread_id=thread_id,
+                business_connection_id=business_connection_id,
+                destiny=destiny,
+            ),
+        )
@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from time import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+
+PERSON_KEYS = {'from', 'chat', 'user', 'sender_chat', 'forward_from', 'forward_from_chat', 'via_bot'}
+DROPPED_KEYS = {'contact', 'location', 'venue', 'phone_number', 'bio'}
+NUMBER = re.compile(r'^\s*-?\d+([.,]\d+)?\s*$')
+
+
+class Anonymizer:
+    def __init__(self, salt: str):
+        self.salt = salt
+
+    def _hash(self, value: Any) -> int:
+        digest = hashlib.blake2b(f'{self.salt}:{value}'.encode(), digest_size=6).digest()
+        return int.from_bytes(digest, 'big')
+
+    def anonymize_id(self, value: int) -> int:
+        if value < 0:
+            return -(10 ** 12 + self._hash(value) % 10 ** 12)
+        return 10 ** 9 + self._hash(value) % 10 ** 9
+
+    def anonymize_text(self, text: str) -> str:
+        # Commands and amounts drive the order flow, everything else is free text
+        if text.startswith('/') or NUMBER.match(text):
+            return text
+        return 'x' * len(text)
+
+    def anonymize_person(self, person: dict) -> dict:
+        person = dict(person)
+        if 'id' in person:
+            person['id'] = self.anonymize_id(person['id'])
+        if person.get('username'):
+            person['username'] = f"user_{person['id']}"
+        for key in ('first_name', 'last_name', 'title'):
+            if person.get(key):
+                person[key] = key
+        return person
+
+    def anonymize(self, value: Any, key: str | None = None) -> Any:
+        if isinstance(value, dict):
+            if key in PERSON_KEYS:
+                value = self.anonymize_person(value)
+            return {
+                child_key: self.anonymize(child, child_key)
+                for child_key, child in value.items()
+                if child_key not in DROPPED_KEYS
+            }
+        if isinstance(value, list):
+            return [self.anonymize(item, key) for item in value]
+        if key in ('text', 'caption') and isinstance(value, str):
+            return self.anonymize_text(value)
+        if key == 'file_name' and isinstance(value, str):
+            return 'file' + (value[value.rfind('.'):] if '.' in value else '')
+        if key == 'chat_instance':
+            return str(self._hash(value))
+        if key in ('file_id', 'file_unique_id') and isinstance(value, str):
+            # Real file ids can be downloaded with the bot token, keep only which items are the same file
+            return f'{key}_{self._hash(value)}'
+        return value
+
+
+class UpdateRecorderMiddleware(BaseMiddleware):
+    def __init__(self, path: str, salt: str):
+        self.path = path
+        if not salt:
+            # Without a salt the hashed ids can be brute-forced back to the real ones
+            raise RuntimeError('RECORD_UPDATES_SALT must be set to record updates')
+        self.anonymizer = Anonymizer(salt)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._queue: asyncio.Queue[str] | None = None
+        self._task: asyncio.Task | None = None
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        # Handler data is copied on the way down, so capture_roles fills this dict in place
+        record = data["update_record"] = {'ts': time(), 'roles': []}
+        try:
+            return await handler(event, data)
+        finally:
+            try:
+                self.record(event, record)
+            except Exception:
+                logging.exception('Failed to record update %s', event.update_id)
+
+    async def capture_roles(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        # Registered after IdentityMiddleware. Roles let the replay seed matching users for the anonymized usernames
+        record = data.get("update_record")
+        if record is not None:
+            record['roles'] = sorted(role.value for role in data.get("roles", ()))
+        return await handler(event, data)
+
+    def record(self, event: Update, record: Dict[str, Any]) -> None:
+        update = event.model_dump(mode='json', by_alias=True, exclude_none=True)
+        line = json.dumps({
+            'ts': record['ts'],
+            'update': self.anonymizer.anonymize(update),
+            'roles': record['roles'],
+        }, ensure_ascii=False)
+        self._queue.put_nowait(line + '\n')
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._write())
+
+    async def close(self) -> None:
+        if self._task:
+            await self._queue.join()
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._file.close()
+
+    async def _write(self) -> None:
+        # One writer keeps the lines in order, everything queued meanwhile goes to the file in one write
+        while True:
+            lines = [await self._queue.get()]
+            while not self._queue.empty():
+                lines.append(self._queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._flush, ''.join(lines))
+            except Exception:
+                logging.exception('Failed to write %s recorded updates', len(lines))
+            for _ in lines:
+                self._queue.task_done()
+
+    def _flush(self, text: str) -> None:
+        self._file.write(text)
+        self._file.flush()
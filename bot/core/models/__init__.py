@@ -5,6 +5,8 @@ import core.models.relation as relation
 import core.models.config as config
 import core.models.file as file
 import core.models.user_role as user_role
+import core.models.fsm_state as fsm_state
+import core.models.update_queue as update_queue
 from core.models.models import (
     User,
     Order,
@@ -13,4 +15,6 @@ from core.models.models import (
     Relation,
     Config,
     UserRole,
+    FsmState,
+    QueuedUpdate,
 )
\ No newline at end of file
@@ -1,7 +1,8 @@
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from .models import Config
-from sqlalchemy import select, update, insert, delete
+from sqlalchemy import select, update, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from core.database import connection
 
 
@@ -26,32 +27,61 @@ async def get_config_by_key(
             })
             query = insert(Config).values(id=config.id, key=config.key, data=config.data, created_at=config.created_at)
             await session.execute(query)
-            await session.commit()
             return config
         elif key == 'payeer_chat_id':
             config = Config(key='payeer_chat_id', data={'chat_id':0})
             query = insert(Config).values(id=config.id, key=config.key, data=config.data, created_at=config.created_at)
             await session.execute(query)
-            await session.commit()
             return config
     return records
 
 
+@connection
+async def get_all_configs(
+    session: AsyncSession,
+) -> list[Config]:
+    query = select(Config)
+    result = await session.execute(query)
+    records = result.scalars().all()
+    return records
+
+
+@connection
+async def get_configs_by_keys(
+    session: AsyncSession,
+    keys: list[str],
+) -> list[Config]:
+    query = select(Config).where(Config.key.in_(keys))
+    result = await session.execute(query)
+    records = result.scalars().all()
+    return records
+
+
+@connection
+async def get_config_versions(
+    session: AsyncSession,
+) -> dict[str, int]:
+    query = select(Config.key, Config.version)
+    result = await session.execute(query)
+    return dict(result.tuples().all())
+
+
 @connection
 async def replace_config(
     session: AsyncSession,
     config: Config,
 ) -> None:
-    query = delete(Config).where(Config.key == config.key)
-    await session.execute(query)
-    query = insert(Config).values(
+    query = pg_insert(Config).values(
         id=config.id,
         key=config.key,
         data=config.data,
         created_at=datetime.now(),
     )
+    query = query.on_conflict_do_update(
+        index_elements=[Config.key],
+        set_={'data': query.excluded.data, 'updated_at': datetime.now()},
+    )
     await session.execute(query)
-    await session.commit()
 
 
 @connection
@@ -64,4 +94,3 @@ async def update_config(
         updated_at=datetime.now(),
     )
     await session.execute(query)
-    await session.commit()
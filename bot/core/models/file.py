@@ -1,6 +1,7 @@
+from datetime import datetime
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, insert, update, delete
 from core.database import connection
 from .models import File
 
@@ -11,7 +12,26 @@ async def add_file(
     file: File
 ) -> None:
     session.add(file)
-    await session.commit()
+
+
+@connection
+async def add_files(
+    session: AsyncSession,
+    files: list[File],
+) -> None:
+    if not files:
+        return
+    query = insert(File).values([
+        dict(
+            id=file.id,
+            path=file.path,
+            media_type=file.media_type,
+            order_id=file.order_id,
+            tg_file_id=file.tg_file_id,
+            created_at=file.created_at,
+        ) for file in files
+    ])
+    await session.execute(query)
 
 
 @connection
@@ -25,6 +45,18 @@ async def get_order_files(
     return records
 
 
+@connection
+async def update_files_tg_file_id(
+    session: AsyncSession,
+    files: list[File],
+) -> None:
+    updated_at = datetime.now()
+    await session.execute(update(File), [
+        dict(id=file.id, tg_file_id=file.tg_file_id, updated_at=updated_at)
+        for file in files
+    ])
+
+
 @connection
 async def delete_order_files(
     session: AsyncSession,
@@ -32,4 +64,3 @@ async def delete_order_files(
 ) -> None:
     query = delete(File).where(File.order_id == order_id)
     await session.execute(query)
-    await session.commit()
\ No newline at end of file
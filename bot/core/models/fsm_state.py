@@ -0,0 +1,64 @@
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import case, select, delete, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import connection
+from .models import FsmState
+
+
+@connection
+async def get_fsm_state(
+    session: AsyncSession,
+    id: UUID,
+) -> FsmState | None:
+    query = select(FsmState).where(
+        FsmState.id == id,
+        or_(FsmState.expires_at == None, FsmState.expires_at > datetime.now()),
+    )
+    result = await session.execute(query)
+    record = result.scalars().first()
+    return record
+
+
+@connection
+async def upsert_fsm_state(
+    session: AsyncSession,
+    fsm_state: FsmState,
+    fields: list[str],
+) -> None:
+    query = insert(FsmState).values(
+        id=fsm_state.id,
+        bot_id=fsm_state.bot_id,
+        chat_id=fsm_state.chat_id,
+        user_id=fsm_state.user_id,
+        state=fsm_state.state,
+        data=fsm_state.data,
+        expires_at=fsm_state.expires_at,
+        created_at=fsm_state.created_at,
+    )
+    # A state that is not written is kept and data that is not written is merged with
+    # the given keys, unless the row has expired
+    expired = FsmState.expires_at <= datetime.now()
+    kept = {'state': FsmState.state, 'data': FsmState.data.op('||')(query.excluded.data)}
+    query = query.on_conflict_do_update(
+        index_elements=[FsmState.id],
+        set_={
+            **{
+                field: getattr(query.excluded, field) if field in fields
+                else case((expired, getattr(query.excluded, field)), else_=kept[field])
+                for field in ('state', 'data')
+            },
+            'expires_at': query.excluded.expires_at,
+            'updated_at': datetime.now(),
+        },
+    )
+    await session.execute(query)
+
+
+@connection
+async def delete_expired_fsm_states(
+    session: AsyncSession,
+) -> None:
+    query = delete(FsmState).where(FsmState.expires_at <= datetime.now())
+    await session.execute(query)
@@ -1,6 +1,7 @@
+from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.utils.enums import MessageTypeEnum
-from sqlalchemy import select, delete
+from sqlalchemy import select, insert, delete
 from core.database import connection
 from .models import Message
 
@@ -11,7 +12,26 @@ async def add_message(
     message: Message,
 ) -> None:
     session.add(message)
-    await session.commit()
+
+
+@connection
+async def add_messages(
+    session: AsyncSession,
+    messages: list[Message],
+) -> None:
+    if not messages:
+        return
+    query = insert(Message).values([
+        dict(
+            id=message.id,
+            chat_id=message.chat_id,
+            message_id=message.message_id,
+            message_type=message.message_type,
+            order_id=message.order_id,
+            created_at=message.created_at,
+        ) for message in messages
+    ])
+    await session.execute(query)
 
 
 @connection
@@ -51,7 +71,17 @@ async def delete_message(
 ) -> None:
     query = delete(Message).where(Message.id == id)
     await session.execute(query)
-    await session.commit()
+
+
+@connection
+async def delete_messages_by_ids(
+    ids: list[UUID],
+    session: AsyncSession
+) -> None:
+    if not ids:
+        return
+    query = delete(Message).where(Message.id.in_(ids))
+    await session.execute(query)
 
 
 @connection
@@ -61,4 +91,3 @@ async def delete_messages(
 ) -> None:
     query = delete(Message).where(Message.order_id == order_id)
     await session.execute(query)
-    await session.commit()
\ No newline at end of file
@@ -1,8 +1,8 @@
 from datetime import datetime
 from core.utils.enums import FileMediaTypeEnum, OrderCurrencyEnum, UserRoleEnum, OrderStateEnum, MessageTypeEnum
-from sqlalchemy.dialects.postgresql import JSON as pgJSON
+from sqlalchemy.dialects.postgresql import JSON as pgJSON, JSONB as pgJSONB
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import ForeignKey, BigInteger
+from sqlalchemy import ForeignKey, BigInteger, Index, text
 from .base import Base
 from uuid import UUID, uuid4
 
@@ -12,6 +12,8 @@ class User(Base):
 
     tg_username: Mapped[str] = mapped_column(unique=True)
     chat_id: Mapped[int] = mapped_column(BigInteger)
+    # Bumped by triggers whenever the user or one of its roles changes, including from the admin panel
+    version: Mapped[int] = mapped_column(BigInteger, server_default=text('1'))
 
     def __init__(
         self,
@@ -27,7 +29,7 @@ class User(Base):
 class UserRole(Base):
     __tablename__ = 'users_roles'
 
-    user_id: Mapped[UUID] = mapped_column(ForeignKey('users.id'))
+    user_id: Mapped[UUID] = mapped_column(ForeignKey('users.id'), index=True)
     role: Mapped[UserRoleEnum]
 
     def __init__(
@@ -46,23 +48,30 @@ class File(Base):
 
     path: Mapped[str] = mapped_column(unique=True)
     media_type: Mapped[FileMediaTypeEnum]
-    order_id: Mapped[UUID] = mapped_column(ForeignKey('orders.id'))
+    order_id: Mapped[UUID] = mapped_column(ForeignKey('orders.id'), index=True)
+    tg_file_id: Mapped[str] = mapped_column(nullable=True)
 
     def __init__(
         self,
         path: str,
         media_type: FileMediaTypeEnum,
         order_id: UUID,
+        tg_file_id: str = None,
     ) -> None:
         self.id = uuid4()
         self.path = path
         self.media_type = media_type
         self.order_id = order_id
+        self.tg_file_id = tg_file_id
         self.created_at = datetime.now()
 
 
 class Message(Base):
     __tablename__ = 'messages'
+    __table_args__ = (
+        Index('ix_messages_chat_id_message_id', 'chat_id', 'message_id'),
+        Index('ix_messages_order_id_message_type', 'order_id', 'message_type'),
+    )
 
     chat_id: Mapped[int] = mapped_column(BigInteger)
     message_id: Mapped[int] = mapped_column(BigInteger)
@@ -87,6 +96,9 @@ class Message(Base):
 
 class Order(Base):
     __tablename__ = 'orders'
+    __table_args__ = (
+        Index('ix_orders_initiator_id_state', 'initiator_id', 'state'),
+    )
 
     level: Mapped[int]
     step: Mapped[int]
@@ -123,7 +135,7 @@ class Order(Base):
 class Relation(Base):
     __tablename__ = 'relations'
 
-    initiator_id: Mapped[UUID] = mapped_column(ForeignKey('users.id'))
+    initiator_id: Mapped[UUID] = mapped_column(ForeignKey('users.id'), index=True)
     first_inspector_id: Mapped[UUID] = mapped_column(ForeignKey('users.id'), nullable=True)
     second_inspector_id: Mapped[UUID] = mapped_column(ForeignKey('users.id'), nullable=True)
     third_inspector_id: Mapped[UUID] = mapped_column(ForeignKey('users.id'), nullable=True)
@@ -133,8 +145,10 @@ class Relation(Base):
 class Config(Base):
     __tablename__ = 'configs'
 
-    key: Mapped[str]
+    key: Mapped[str] = mapped_column(unique=True)
     data: Mapped[dict] = mapped_column(pgJSON)
+    # Bumped by the configs_bump_version trigger on every update, including ones from the admin panel
+    version: Mapped[int] = mapped_column(BigInteger, server_default=text('1'))
 
     def __init__(
         self,
@@ -144,4 +158,64 @@ class Config(Base):
         self.id = uuid4()
         self.key = key
         self.data = data
+        self.created_at = datetime.now()
+
+
+class FsmState(Base):
+    __tablename__ = 'fsm_states'
+
+    bot_id: Mapped[int] = mapped_column(BigInteger)
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    user_id: Mapped[int] = mapped_column(BigInteger)
+    state: Mapped[str] = mapped_column(nullable=True)
+    data: Mapped[dict] = mapped_column(pgJSONB)
+    expires_at: Mapped[datetime] = mapped_column(nullable=True, index=True)
+
+    def __init__(
+        self,
+        id: UUID,
+        bot_id: int,
+        chat_id: int,
+        user_id: int,
+        state: str = None,
+        data: dict = None,
+        expires_at: datetime = None,
+    ):
+        self.id = id
+        self.bot_id = bot_id
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.state = state
+        self.data = data or {}
+        self.expires_at = expires_at
+        self.created_at = datetime.now()
+
+
+class QueuedUpdate(Base):
+    __tablename__ = 'update_queue'
+
+    update_id: Mapped[int] = mapped_column(BigInteger, unique=True)
+    partition: Mapped[int]
+    payload: Mapped[dict] = mapped_column(pgJSONB)
+    processed_at: Mapped[datetime] = mapped_column(nullable=True)
+
+    __table_args__ = (
+        Index(
+            'ix_update_queue_partition_update_id',
+            'partition',
+            'update_id',
+            postgresql_where=text('processed_at IS NULL'),
+        ),
+    )
+
+    def __init__(
+        self,
+        update_id: int,
+        partition: int,
+        payload: dict,
+    ):
+        self.id = uuid4()
+        self.update_id = update_id
+        self.partition = partition
+        self.payload = payload
         self.created_at = datetime.now()
\ No newline at end of file
@@ -12,7 +12,6 @@ async def add_order(
     order: Order,
 ) -> None:
     session.add(order)
-    await session.commit()
 
 
 @connection
@@ -48,4 +47,3 @@ async def update_order(
         updated_at=datetime.now()
     )
     await session.execute(query)
-    await session.commit()
@@ -12,7 +12,6 @@ async def add_relation(
     relation: Relation,
 ) -> None:
     session.add(relation)
-    await session.commit()
 
 
 @connection
@@ -49,7 +48,6 @@ async def update_relation(
         updated_at=datetime.now()
     )
     await session.execute(query)
-    await session.commit()
 
 
 @connection
@@ -59,4 +57,3 @@ async def delete_user(
 ) -> None:
     query = delete(Relation).where(Relation.id == id)
     await session.execute(query)
-    await session.commit()
\ No newline at end of file
@@ -0,0 +1,66 @@
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import select, delete, update, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import connection
+from .models import QueuedUpdate
+
+
+# Workers LISTEN on this channel, the payload is the partition that got a new update
+NOTIFY_CHANNEL = 'update_queue'
+
+
+@connection
+async def add_update(
+    session: AsyncSession,
+    update: QueuedUpdate,
+) -> None:
+    # Telegram redelivers webhooks and a new polling leader starts without an offset
+    query = insert(QueuedUpdate).values(
+        id=update.id,
+        update_id=update.update_id,
+        partition=update.partition,
+        payload=update.payload,
+        created_at=update.created_at,
+    ).on_conflict_do_nothing(index_elements=[QueuedUpdate.update_id])
+    await session.execute(query)
+    # Delivered on commit, so the consumer never wakes up before the row is visible
+    await session.execute(select(func.pg_notify(NOTIFY_CHANNEL, str(update.partition))))
+
+
+@connection
+async def get_updates_by_partitions(
+    session: AsyncSession,
+    partitions: list[int],
+    limit: int,
+) -> list[QueuedUpdate]:
+    query = select(QueuedUpdate).where(
+        QueuedUpdate.partition.in_(partitions),
+        QueuedUpdate.processed_at.is_(None),
+    ).order_by(QueuedUpdate.update_id).limit(limit)
+    result = await session.execute(query)
+    records = result.scalars().all()
+    return records
+
+
+@connection
+async def mark_updates_processed(
+    session: AsyncSession,
+    ids: list[UUID],
+) -> None:
+    if not ids:
+        return
+    query = update(QueuedUpdate).where(QueuedUpdate.id.in_(ids)).values(
+        processed_at=datetime.now(),
+    )
+    await session.execute(query)
+
+
+@connection
+async def delete_processed_updates(
+    session: AsyncSession,
+    before: datetime,
+) -> None:
+    query = delete(QueuedUpdate).where(QueuedUpdate.processed_at <= before)
+    await session.execute(query)
@@ -3,6 +3,7 @@ from uuid import UUID
 from sqlalchemy import select, delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.database import connection
+from core.utils.identity import invalidate_identity
 from .models import User
 
 
@@ -12,7 +13,7 @@ async def add_user(
     user: User,
 ) -> None:
     session.add(user)
-    await session.commit()
+    invalidate_identity(session, user.tg_username)
 
 
 @connection
@@ -26,6 +27,16 @@ async def get_user_by_id(
     return records
 
 
+@connection
+async def get_user_versions(
+    session: AsyncSession,
+    tg_usernames: list[str],
+) -> dict[str, int]:
+    query = select(User.tg_username, User.version).where(User.tg_username.in_(tg_usernames))
+    result = await session.execute(query)
+    return dict(result.tuples().all())
+
+
 @connection
 async def get_user_by_tg_username(
     session: AsyncSession,
@@ -52,12 +63,13 @@ async def update_user(
     session: AsyncSession, 
     user: User,
 ) -> None:
+    old_tg_username = await session.scalar(select(User.tg_username).where(User.id == user.id))
     query = update(User).where(User.id == user.id).values(
         tg_username=user.tg_username,
         updated_at=datetime.now()
     )
     await session.execute(query)
-    await session.commit()
+    invalidate_identity(session, old_tg_username, user.tg_username)
 
 
 @connection
@@ -65,6 +77,6 @@ async def delete_user(
     session: AsyncSession,
     id: UUID,
 ) -> None:
-    query = delete(User).where(User.id == id)
-    await session.execute(query)
-    await session.commit()
\ No newline at end of file
+    query = delete(User).where(User.id == id).returning(User.tg_username)
+    result = await session.execute(query)
+    invalidate_identity(session, result.scalar())
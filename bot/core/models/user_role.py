@@ -3,7 +3,13 @@ from uuid import UUID
 from sqlalchemy import select, delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.database import connection
-from .models import UserRole
+from core.utils.identity import invalidate_identity
+from .models import User, UserRole
+
+
+async def invalidate_user_identity(session: AsyncSession, user_id: UUID | None) -> None:
+    tg_username = await session.scalar(select(User.tg_username).where(User.id == user_id))
+    invalidate_identity(session, tg_username)
 
 
 @connection
@@ -12,7 +18,7 @@ async def add_user_role(
     user_role: UserRole,
 ) -> None:
     session.add(user_role)
-    await session.commit()
+    await invalidate_user_identity(session, user_role.user_id)
 
 
 @connection
@@ -55,9 +61,9 @@ async def update_user_role(
     query = update(UserRole).where(UserRole.id == user_role.id).values(
         role=user_role.role,
         updated_at=datetime.now()
-    )
-    await session.execute(query)
-    await session.commit()
+    ).returning(UserRole.user_id)
+    result = await session.execute(query)
+    await invalidate_user_identity(session, result.scalar())
 
 
 @connection
@@ -65,6 +71,6 @@ async def delete_user_role(
     session: AsyncSession,
     id: UUID,
 ) -> None:
-    query = delete(UserRole).where(UserRole.id == id)
-    await session.execute(query)
-    await session.commit()
\ No newline at end of file
+    query = delete(UserRole).where(UserRole.id == id).returning(UserRole.user_id)
+    result = await session.execute(query)
+    await invalidate_user_identity(session, result.scalar())
@@ -1,33 +1,61 @@
 from aiogram import Bot
+from aiogram.filters import CommandObject
 from aiogram.types import Message
 
 from core import models
+from core.utils.config_store import config_store
 from core.utils.enums import UserRoleEnum
+from core.utils.profiler import profiler
 
 
-async def add_payeer_chat_command(message: Message, bot: Bot):
-    user = await models.user.get_user_by_tg_username(
-        tg_username=message.from_user.username,
-    )
-    if not user:
-        await message.reply('Недостаточно прав.')
-        return
-    user_roles = await models.user_role.get_user_roles_by_user_id(user_id=user.id)
-    if not user_roles:
+DEFAULT_PROFILE_LIMIT = 20
+
+
+async def add_payeer_chat_command(
+    message: Message,
+    bot: Bot,
+    roles: frozenset[UserRoleEnum],
+):
+    if UserRoleEnum.ADMIN not in roles:
         await message.reply('Недостаточно прав.')
         return
-    is_admin = False
-    for user_role in user_roles:
-        if user_role.role == UserRoleEnum.ADMIN:
-            is_admin = True
-            break
-    if not is_admin:
-        await message.reply(f'Недостаточно прав.')
-        return
     
     await message.delete()
 
     config = models.Config('payeer_chat_id', {'chat_id':message.chat.id})
-    await models.config.replace_config(config=config)
+    await config_store.replace_config(config=config)
+
+    await message.answer('Чат был успешно добавлен.')
+
 
-    await message.answer('Чат был успешно добавлен.')
\ No newline at end of file
+async def profile_command(
+    message: Message,
+    command: CommandObject,
+    roles: frozenset[UserRoleEnum],
+):
+    if UserRoleEnum.ADMIN not in roles:
+        await message.reply('Недостаточно прав.')
+        return
+
+    args = (command.args or '').split()
+    if args[:1] == ['on']:
+        if len(args) > 1 and not (args[1].isdigit() and int(args[1]) > 0):
+            await message.reply('Количество обновлений должно быть положительным числом.')
+            return
+        limit = int(args[1]) if len(args) > 1 else DEFAULT_PROFILE_LIMIT
+        await profiler.start(limit)
+        await message.reply(
+            f'Профилирование включено: следующие {limit} обновлений каждого обработчика.\n'
+            f'Результаты сохраняются в {profiler.session_path}'
+        )
+        return
+    if args[:1] == ['off']:
+        paths = await profiler.stop()
+        await message.reply(f'Профилирование выключено, сохранено файлов: {len(paths)}.')
+        return
+
+    if not profiler.enabled:
+        await message.reply('Профилирование выключено.\nВключить: /profile on 50\nВыключить: /profile off')
+        return
+    counts = '\n'.join(f'{name}: {count}/{profiler.limit}' for name, count in sorted(profiler.counts.items()))
+    await message.reply(f'Профилирование включено, результаты в {profiler.session_path}\n{counts}')
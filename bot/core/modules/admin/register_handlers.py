@@ -1,7 +1,8 @@
 from aiogram import Dispatcher
 from aiogram.filters import Command
 
-from .handlers import add_payeer_chat_command
+from .handlers import add_payeer_chat_command, profile_command
 
 def register_handlers(dp: Dispatcher) -> None:
-    dp.message.register(add_payeer_chat_command, Command('add_payeer_chat'))
\ No newline at end of file
+    dp.message.register(add_payeer_chat_command, Command('add_payeer_chat'))
+    dp.message.register(profile_command, Command('profile'))
\ No newline at end of file
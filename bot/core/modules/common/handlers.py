@@ -1,3 +1,4 @@
+from uuid import UUID
 from aiogram import Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
@@ -6,7 +7,8 @@ from core import models
 from core.modules.inspector.states import CheckOrderSteps
 from core.modules.payeer.states import PayOrderSteps
 from core.settings import settings
-from core.utils.enums import UserRoleEnum
+from core.utils.config_store import config_store
+from core.utils.enums import MessageTypeEnum, OrderStateEnum, UserRoleEnum
 
 
 from ..keyboards import chooseActionKeyboard
@@ -25,19 +27,29 @@ async def cancel_callback(call: CallbackQuery, bot: Bot, state: FSMContext):
         pass
 
     if (await state.get_state()) == CheckOrderSteps.GET_REPLY.state:
+        order_id = await state.get_value('order_id')
+        order = await models.order.get_order_by_id(id=UUID(order_id)) if order_id else None
+        if order is None:
+            await state.clear()
+            return
         await bot.send_message(
             call.message.chat.id,
             'Выберите действие:',
             reply_to_message_id=(await state.get_value('order_message_id')),
-            reply_markup=chooseActionKeyboard,
+            reply_markup=chooseActionKeyboard(order),
         )
         return
     if (await state.get_state()) == PayOrderSteps.GET_REPLY.state:
+        order_id = await state.get_value('order_id')
+        order = await models.order.get_order_by_id(id=UUID(order_id)) if order_id else None
+        if order is None:
+            await state.clear()
+            return
         await bot.send_message(
             call.message.chat.id,
             'Выберите действие:',
             reply_to_message_id=(await state.get_value('order_message_id')),
-            reply_markup=choosePayActionKeyboard,
+            reply_markup=choosePayActionKeyboard(order),
         )
         return
     
@@ -56,28 +68,77 @@ async def cancel_command(message: Message, bot: Bot, state: FSMContext):
         pass
 
     if (await state.get_state()) == CheckOrderSteps.GET_REPLY.state:
+        order_id = await state.get_value('order_id')
+        order = await models.order.get_order_by_id(id=UUID(order_id)) if order_id else None
+        if order is None:
+            await state.clear()
+            return
         await bot.send_message(
             message.chat.id,
             'Выберите действие:',
             reply_to_message_id=(await state.get_value('order_message_id')),
-            reply_markup=chooseActionKeyboard,
+            reply_markup=chooseActionKeyboard(order),
         )
         return
     if (await state.get_state()) == PayOrderSteps.GET_REPLY.state:
+        order_id = await state.get_value('order_id')
+        order = await models.order.get_order_by_id(id=UUID(order_id)) if order_id else None
+        if order is None:
+            await state.clear()
+            return
         await bot.send_message(
             message.chat.id,
             'Выберите действие:',
             reply_to_message_id=(await state.get_value('order_message_id')),
-            reply_markup=choosePayActionKeyboard,
+            reply_markup=choosePayActionKeyboard(order),
         )
         return
 
     await state.clear()
 
 
-async def start_command(message: Message, bot: Bot):
+async def is_current_order_message(call: CallbackQuery, order: models.Order, order_message: models.Message) -> bool:
+    if call.data.startswith('mark_order_'):
+        if order.state != OrderStateEnum.PENDING or order_message.message_type != MessageTypeEnum.INSPECTOR_MESSAGE:
+            return False
+        relation = await models.relation.get_relation_by_initiator(initiator_id=order.initiator_id)
+        inspector_id = {
+            1: relation.first_inspector_id,
+            2: relation.second_inspector_id,
+            3: relation.third_inspector_id,
+            4: relation.forth_inspector_id,
+        }.get(order.step) if relation else None
+        inspector = await models.user.get_user_by_id(id=inspector_id) if inspector_id else None
+        return inspector is not None and inspector.chat_id == call.message.chat.id
+    return (
+        order.state == OrderStateEnum.SUCCESS
+        and order_message.message_type == MessageTypeEnum.PAYEER_MESSAGE
+        and call.message.chat.id == config_store.payeer_chat_id
+    )
+
+
+async def refresh_order_keyboard(call: CallbackQuery, bot: Bot):
+    # Buttons sent before order ids were packed into callback data
+    reply_to = call.message.reply_to_message
+    order_message = await models.message.get_message(call.message.chat.id, reply_to.message_id) if reply_to else None
+    order = await models.order.get_order_by_id(id=order_message.order_id) if order_message else None
+    if not order or not await is_current_order_message(call, order, order_message):
+        await call.answer('Заявка уже обработана.')
+        return
+    if order.state == OrderStateEnum.PENDING:
+        await call.message.edit_reply_markup(reply_markup=chooseActionKeyboard(order))
+    else:
+        await call.message.edit_reply_markup(reply_markup=choosePayActionKeyboard(order))
+    await call.answer('Кнопки обновлены, нажмите еще раз.')
+
+
+async def start_command(
+    message: Message,
+    bot: Bot,
+    user: models.User | None,
+    roles: frozenset[UserRoleEnum],
+):
     await message.delete()
-    user = await models.user.get_user_by_tg_username(tg_username=message.from_user.username)
     if user == None:
         if message.from_user.username == settings.bots.admin_username:
             user = models.User(
@@ -115,19 +176,17 @@ async def start_command(message: Message, bot: Bot):
                 )
         await message.answer("Запросил разрешение у администратора. Подождите одобрения запроса.")
         return
-    user_roles = await models.user_role.get_user_roles_by_user_id(user_id=user.id)
-    sub = [role.role for role in user_roles]
-    if (UserRoleEnum.UNKNOWN in sub) or (not user_roles):
+    if (UserRoleEnum.UNKNOWN in roles) or (not roles):
         await message.answer("Запросил разрешение у администратора. Подождите одобрения запроса.")
         return
-    if (UserRoleEnum.INITIATOR in sub):
+    if (UserRoleEnum.INITIATOR in roles):
         await message.answer("Для создания заявки используйте команду: /order\nДля отмены создания используйте команду: /cancel")
         return
-    if (UserRoleEnum.INSPECTOR in sub):
+    if (UserRoleEnum.INSPECTOR in roles):
         await message.answer("У вас нет команд, доступные действия будут указаны в кнопках.")
         return
-    if (UserRoleEnum.PAYEER in sub):
+    if (UserRoleEnum.PAYEER in roles):
         await message.answer("У вас нет доступных команд.")
         return
-    if (UserRoleEnum.ADMIN in sub):
-        await message.answer("Для добавления чата плательщиков, в этом чате нужно вызвать команду /add_payeer_chat")
\ No newline at end of file
+    if (UserRoleEnum.ADMIN in roles):
+        await message.answer("Для добавления чата плательщиков, в этом чате нужно вызвать команду /add_payeer_chat\nДля профилирования обработчиков: /profile on 50, выключить: /profile off")
\ No newline at end of file
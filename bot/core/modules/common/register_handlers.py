@@ -1,8 +1,9 @@
 from aiogram import Dispatcher, F
 from aiogram.filters import Command
-from .handlers import cancel_callback, cancel_command, start_command
+from .handlers import cancel_callback, cancel_command, refresh_order_keyboard, start_command
 
 def register_handlers(dp: Dispatcher) -> None:
     dp.callback_query.register(cancel_callback, F.data == "cancel")
+    dp.callback_query.register(refresh_order_keyboard, F.data.startswith(('mark_order_', 'pay_order_')))
     dp.message.register(cancel_command, Command("cancel"))
     dp.message.register(start_command, Command("start"))
\ No newline at end of file
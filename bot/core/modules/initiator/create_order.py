@@ -1,40 +1,39 @@
-import os
-
-from time import time
 from aiogram import Bot
-from aiogram.types import Message, CallbackQuery, InputMediaDocument, InputMediaPhoto, InputMediaVideo, FSInputFile
+from aiogram.types import Message, CallbackQuery, InputMediaDocument, InputMediaPhoto, InputMediaVideo
 from aiogram.fsm.context import FSMContext
 
 from core import models
 from core.utils.get_order_level import get_order_level
 from core.utils.get_order_next_step import get_order_next_step
+from core.utils.get_order_text import get_order_text
 from core.utils.enums import FileMediaTypeEnum, MessageTypeEnum, OrderCurrencyEnum, OrderStateEnum, UserRoleEnum
-from core.utils.maps import ROLE_ENUM_TO_TEXT, STATE_ENUM_TO_TEXT
+from core.utils.maps import ROLE_ENUM_TO_TEXT
+from core.utils.delete_messages import delete_chat_messages
+from core.utils.download_files import download_files, download_path
 from core.utils.is_float import is_float
+from core.utils.media_group import send_order_files
+from core.utils.wizard_message import edit_wizard_message
 
 from ..keyboards import cancelButton, chooseActionKeyboard, SkipOrCancelKeyboard
 from .keyboards import CurrencyKeyboard
 from .states import CreateOrderSteps
 
 
-async def create_order_command(message: Message, bot: Bot, state: FSMContext):
-    user = await models.user.get_user_by_tg_username(
-        tg_username=message.from_user.username,
-    )
+async def create_order_command(
+    message: Message,
+    bot: Bot,
+    state: FSMContext,
+    user: models.User | None,
+    roles: frozenset[UserRoleEnum],
+):
     if not user:
         await message.reply('Не нашел ваш username. Убедитесь, что администратор добавил вас в бота.')
         return
-    user_roles = await models.user_role.get_user_roles_by_user_id(user_id=user.id)
-    if not user_roles:
+    if not roles:
         await message.reply('Не нашел вашу роль. Убедитесь, что администратор зарегистрировал вас.')
         return
-    is_initiator = False
-    for user_role in user_roles:
-        if user_role.role == UserRoleEnum.INITIATOR:
-            is_initiator = True
-            break
-    if not is_initiator:
-        await message.reply(f'Для создания заявок нужна роль инициатора. Ваши роли: {', '.join([ROLE_ENUM_TO_TEXT[role.role] for role in user_roles])}.')
+    if UserRoleEnum.INITIATOR not in roles:
+        await message.reply(f'Для создания заявок нужна роль инициатора. Ваши роли: {', '.join([ROLE_ENUM_TO_TEXT[role] for role in roles])}.')
         return
     
     await message.delete()
@@ -52,47 +51,44 @@ async def create_order_command(message: Message, bot: Bot, state: FSMContext):
 
 
 async def get_description(message: Message, bot: Bot, state: FSMContext):
-    await bot.delete_message(
-        await state.get_value('last_chat_id'),
-        await state.get_value('last_message_id')
-    )
-
     cond = len(message.text) <= 700
     if not cond:
-        new_message = await message.answer(
+        await edit_wizard_message(
+            bot,
+            state,
+            message.chat.id,
             '<u><b>Создание заявки</b></u>\n\n'\
             'Слишком большая длина описания.\n\n'\
             'Отправьте описание для заявки. '\
             'Максимальная длина - 700 символов.',
             reply_markup=cancelButton,
         )
-        await state.update_data(last_chat_id=new_message.chat.id, last_message_id=new_message.message_id)
         return
 
     await message.delete()
     await state.update_data(description=message.text)
 
-    new_message = await message.answer(
+    await edit_wizard_message(
+        bot,
+        state,
+        message.chat.id,
         '<u><b>Создание заявки</b></u>\n\n'\
         'Выберите валюту.\n\n'\
         f'Описание: {message.text}',
         reply_markup=CurrencyKeyboard,
     )
 
-    await state.update_data(last_chat_id=new_message.chat.id, last_message_id=new_message.message_id)
     await state.set_state(CreateOrderSteps.GET_CURRENCY)
 
 
 async def get_currency(call: CallbackQuery, bot: Bot, state: FSMContext):
-    await bot.delete_message(
-        await state.get_value('last_chat_id'),
-        await state.get_value('last_message_id')
-    )
-
     currency = call.data.replace('currency_', '')
     await state.update_data(currency=currency)
 
-    new_message = await call.message.answer(
+    await edit_wizard_message(
+        bot,
+        state,
+        call.message.chat.id,
         '<u><b>Создание заявки</b></u>\n\n'\
         'Укажите сумму.\n\n'\
         f'Описание: {await state.get_value('description')}\n'\
@@ -100,32 +96,31 @@ async def get_currency(call: CallbackQuery, bot: Bot, state: FSMContext):
         reply_markup=cancelButton,
     )
 
-    await state.update_data(last_chat_id=new_message.chat.id, last_message_id=new_message.message_id)
     await state.set_state(CreateOrderSteps.GET_AMOUNT)
 
 
 async def get_amount(message: Message, bot: Bot, state: FSMContext):
-    await bot.delete_message(
-        await state.get_value('last_chat_id'),
-        await state.get_value('last_message_id')
-    )
-    
     cond = is_float(message.text.replace(',','.')) or float(message.text.replace(',','.')) <= 0
     if not cond:
-        new_message = await message.answer(
+        await edit_wizard_message(
+            bot,
+            state,
+            message.chat.id,
             '<u><b>Создание заявки</b></u>\n\n'\
             'Неверный формат числа.\n\n'\
             'Укажите сумму.',
             reply_markup=cancelButton,
         )
-        await state.update_data(last_chat_id=new_message.chat.id, last_message_id=new_message.message_id)
         return
     
     await message.delete()
     amount = float(message.text.replace(',','.'))
     await state.update_data(amount=amount)
 
-    new_message = await message.answer(
+    await edit_wizard_message(
+        bot,
+        state,
+        message.chat.id,
         '<u><b>Создание заявки</b></u>\n\n'\
         'Отправьте вложения. '\
         'Можно отправлять документы, фото и видео.\n\n'\
@@ -135,7 +130,6 @@ async def get_amount(message: Message, bot: Bot, state: FSMContext):
         reply_markup=SkipOrCancelKeyboard,
     )
 
-    await state.update_data(last_chat_id=new_message.chat.id, last_message_id=new_message.message_id)
     await state.set_state(CreateOrderSteps.GET_FILES)
 
 
@@ -143,12 +137,13 @@ async def get_files(
     message: Message,
     bot: Bot,
     state: FSMContext,
+    user: models.User | None,
     album: list[Message] = None,
 ):
     if album == None:
         album = [message]
     initiator_username = album[-1].from_user.username
-    initiator = await models.user.get_user_by_tg_username(tg_username=initiator_username)
+    initiator = user
     relation = await models.relation.get_relation_by_initiator(initiator_id=initiator.id)
     if relation == None:
         await message.answer('Администратор не назначил вам проверяющих. Обратитесь к нему за помощью.')
@@ -173,10 +168,7 @@ async def get_files(
         case 5:
             await album[-1].answer("Администратор не назначил вам проверяющих. Обратитесь к нему за помощью.")
             return
-    is_document = False
-    for message in album:
-        if message.document: is_document = True
-        await message.delete()
+    is_document = any(message.document for message in album)
     order = models.Order(
         level,
         step,
@@ -188,14 +180,12 @@ async def get_files(
     )
     await models.order.add_order(order=order)
 
-    order_text = f'ID: {order.id}\n' \
-    f'Статус: {STATE_ENUM_TO_TEXT[order.state]}\n'\
-    f'Сумма: {order.amount} {order.currency.value}\n'\
-    f'Описание: {order.description}'
+    order_text = get_order_text(order)
 
-    await bot.delete_message(
-        await state.get_value('last_chat_id'),
-        await state.get_value('last_message_id')
+    await delete_chat_messages(
+        bot,
+        album[-1].chat.id,
+        [message.message_id for message in album] + [await state.get_value('last_message_id')],
     )
     
     media_group = []
@@ -221,95 +211,73 @@ async def get_files(
         chat_id=album[-1].chat.id
     )
 
-    for message in new_media_group:
-        model_message = models.Message(
+    await models.message.add_messages(messages=[
+        models.Message(
             chat_id=message.chat.id,
             message_id=message.message_id,
             message_type=MessageTypeEnum.INITIATOR_MESSAGE,
             order_id=order.id,
-        )
-        await models.message.add_message(message=model_message)
+        ) for message in new_media_group
+    ])
 
     files: list[models.File] = []
+    downloads = []
 
     if is_document:
         for message in album:
-            path = os.path.join('/data','files',f'{int(time())}_{message.document.file_name}')
-            await bot.download(message.document, path)
+            path = download_path(message.document.file_name)
             file = models.File(
                 path,
                 FileMediaTypeEnum.DOCUMENT,
                 order.id,
+                message.document.file_id,
             )
-            await models.file.add_file(file=file)
+            downloads.append((message.document, file))
             files.append(file)
     else:
         for message in album:
             if message.photo:
-                path = os.path.join('/data','files',f'{int(time())}_{message.photo[-1].file_id}')
-                await bot.download(message.photo[-1], path)
+                path = download_path()
                 file = models.File(
                     path,
                     FileMediaTypeEnum.PHOTO,
                     order.id,
+                    message.photo[-1].file_id,
                 )
-                await models.file.add_file(file=file)
+                downloads.append((message.photo[-1], file))
                 files.append(file)
             else:
-                path = os.path.join('/data','files',f'{int(time())}_{message.video.file_name}')
-                await bot.download(message.video, path)
+                path = download_path(message.video.file_name)
                 file = models.File(
                     path,
                     FileMediaTypeEnum.VIDEO,
                     order.id,
+                    message.video.file_id,
                 )
-                await models.file.add_file(file=file)
+                downloads.append((message.video, file))
                 files.append(file)
-        
+    await download_files(bot, downloads)
+    await models.file.add_files(files=files)
 
-    order_text = f"ID: {order.id}\n"\
-    f"Инициатор: @{initiator_username}\n"\
-    f'Сумма: {order.amount} {order.currency.value}\n'\
-    f'Описание: {order.description}'
+    order_text = get_order_text(order, initiator_username=initiator_username)
     
-    media_group = []
-
-    if is_document:
-        caption = None
-        for file in files:
-            if file == files[-1]:
-                caption = order_text
-            media_group.append(InputMediaDocument(media=FSInputFile(file.path), caption=caption))
-    else:
-        caption = None
-        for file in files:
-            if file == files[-1]:
-                caption = order_text
-            if file.media_type == FileMediaTypeEnum.PHOTO:
-                media_group.append(InputMediaPhoto(media=FSInputFile(file.path), caption=caption))
-            else:
-                media_group.append(InputMediaVideo(media=FSInputFile(file.path), caption=caption))    
-
-    new_media_group = await bot.send_media_group(
-        chat_id=inspector.chat_id,
-        media=media_group,
-    )
+    new_media_group = await send_order_files(bot, inspector.chat_id, files, order_text)
 
     await bot.send_message(
         chat_id=inspector.chat_id,
         text="Выберите действие:",
         reply_to_message_id=new_media_group[-1].message_id,
-        reply_markup=chooseActionKeyboard
+        reply_markup=chooseActionKeyboard(order)
     )
 
-    for message in new_media_group:
-        model_message = models.Message(
+    await models.message.add_messages(messages=[
+        models.Message(
             message.chat.id,
             message.message_id,
             MessageTypeEnum.INSPECTOR_MESSAGE,
             order.id,
-        )
-        await models.message.add_message(message=model_message)
+        ) for message in new_media_group
+    ])
 
     await state.clear()
 
@@ -318,9 +286,10 @@ async def get_files_callback(
     call: CallbackQuery,
     bot: Bot,
     state: FSMContext,
+    user: models.User | None,
 ):
     initiator_username = call.from_user.username
-    initiator = await models.user.get_user_by_tg_username(tg_username=initiator_username)
+    initiator = user
     relation: models.Relation = await models.relation.get_relation_by_initiator(initiator_id=initiator.id)
     state_data = await state.get_data()
     level = await get_order_level(
@@ -352,17 +321,11 @@ async def get_files_callback(
     )
     await models.order.add_order(order=order)
 
-    order_text = f'ID: {order.id}\n' \
-    f'Статус: {STATE_ENUM_TO_TEXT[order.state]}\n'\
-    f'Сумма: {order.amount} {order.currency.value}\n'\
-    f'Описание: {order.description}'
-
-    await bot.delete_message(
-        await state.get_value('last_chat_id'),
-        await state.get_value('last_message_id')
-    )
+    order_text = get_order_text(order)
 
-    new_message = await call.message.answer(order_text)
+    new_message = await edit_wizard_message(bot, state, call.message.chat.id, order_text)
+    if not isinstance(new_message, Message):
+        new_message = call.message
     model_message = models.Message(
         chat_id=new_message.chat.id,
         message_id=new_message.message_id,
@@ -371,16 +334,13 @@ async def get_files_callback(
     )
     await models.message.add_message(message=model_message)
 
-    order_text = f"ID: {order.id}\n"\
-    f"Инициатор: @{initiator_username}\n"\
-    f'Сумма: {order.amount} {order.currency.value}\n'\
-    f'Описание: {order.description}'
+    order_text = get_order_text(order, initiator_username=initiator_username)
     new_message = await bot.send_message(inspector.chat_id, order_text)
     await bot.send_message(
         chat_id=inspector.chat_id,
         text="Выберите действие:",
         reply_to_message_id=new_message.message_id,
-        reply_markup=chooseActionKeyboard
+        reply_markup=chooseActionKeyboard(order)
     )
     model_message = models.Message(
         new_message.chat.id,
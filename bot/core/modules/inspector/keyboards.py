@@ -1,15 +1,20 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from core import models
+from core.utils.enums import OrderActionEnum
+from core.utils.order_callback import OrderCallback
 
-chooseActionKeyboard = InlineKeyboardMarkup(inline_keyboard=[
-    [
-        InlineKeyboardButton(
-            text = "Выплатить",
-            callback_data="pay_order_success"
-        ),
-        InlineKeyboardButton(
-            text = "Отклонить",
-            callback_data="pay_order_canceled"
-        )
-    ]
-])
\ No newline at end of file
+
+def chooseActionKeyboard(order: models.Order) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text = "Выплатить",
+                callback_data=OrderCallback.for_order(OrderActionEnum.PAY_SUCCESS, order.id, order.step).pack()
+            ),
+            InlineKeyboardButton(
+                text = "Отклонить",
+                callback_data=OrderCallback.for_order(OrderActionEnum.PAY_CANCELED, order.id, order.step).pack()
+            )
+        ]
+    ])
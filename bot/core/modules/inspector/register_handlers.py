@@ -1,6 +1,9 @@
 from aiogram import Dispatcher, F
 from aiogram.filters import Command, or_f
 
+from core.utils.enums import OrderActionEnum
+from core.utils.order_callback import OrderCallback
+
 
 from .check_order import mark_order, reply_order
 from .states import CheckOrderSteps
@@ -8,5 +11,8 @@ from .states import CheckOrderSteps
 
 
 def register_handlers(dp: Dispatcher) -> None:
-    dp.callback_query.register(mark_order, F.data.startswith('mark_order_'))
+    dp.callback_query.register(
+        mark_order,
+        OrderCallback.filter(F.action.in_({OrderActionEnum.MARK_SUCCESS, OrderActionEnum.MARK_CANCELED})),
+    )
     dp.message.register(reply_order, CheckOrderSteps.GET_REPLY, F.text)
\ No newline at end of file
@@ -1,5 +1,9 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from core import models
+from core.utils.enums import OrderActionEnum
+from core.utils.order_callback import OrderCallback
+
 
 cancelButton = InlineKeyboardMarkup(inline_keyboard=[
     [
@@ -27,15 +31,16 @@ SkipOrCancelKeyboard = InlineKeyboardMarkup(inline_keyboard=[
 ])
 
 
-chooseActionKeyboard = InlineKeyboardMarkup(inline_keyboard=[
-    [
-        InlineKeyboardButton(
-            text = "Одобрить",
-            callback_data="mark_order_success"
-        ),
-        InlineKeyboardButton(
-            text = "Отклонить",
-            callback_data="mark_order_canceled"
-        )
-    ]
-])
\ No newline at end of file
+def chooseActionKeyboard(order: models.Order) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text = "Одобрить",
+                callback_data=OrderCallback.for_order(OrderActionEnum.MARK_SUCCESS, order.id, order.step).pack()
+            ),
+            InlineKeyboardButton(
+                text = "Отклонить",
+                callback_data=OrderCallback.for_order(OrderActionEnum.MARK_CANCELED, order.id, order.step).pack()
+            )
+        ]
+    ])
@@ -1,39 +1,43 @@
 import os
+from uuid import UUID
 from aiogram import Bot
-from aiogram.types import CallbackQuery, Message, InputMediaDocument, InputMediaPhoto, InputMediaVideo, FSInputFile
+from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 
 from core import models
-from core.utils.enums import FileMediaTypeEnum, MessageTypeEnum, OrderStateEnum, UserRoleEnum
+from core.utils.delete_messages import delete_order_messages
+from core.utils.enums import MessageTypeEnum, OrderActionEnum, OrderStateEnum, UserRoleEnum
 from core.utils.get_order_next_step import get_order_next_step
-from core.utils.maps import STATE_ENUM_TO_TEXT
+from core.utils.get_order_text import get_order_text
+from core.utils.media_group import send_order_files
+from core.utils.order_callback import OrderCallback
 
 from .states import PayOrderSteps
 from ..keyboards import cancelButton, SkipOrCancelKeyboard, chooseActionKeyboard
+from ..inspector.keyboards import chooseActionKeyboard as choosePayActionKeyboard
 
 
-async def pay_order(call: CallbackQuery, bot: Bot, state: FSMContext):
-    user = await models.user.get_user_by_tg_username(
-        tg_username=call.from_user.username,
-    )
-    if not user:
+async def pay_order(
+    call: CallbackQuery,
+    callback_data: OrderCallback,
+    bot: Bot,
+    state: FSMContext,
+    roles: frozenset[UserRoleEnum],
+):
+    if UserRoleEnum.PAYEER not in roles:
         await call.answer('Недостаточно прав.')
         return
-    user_roles = await models.user_role.get_user_roles_by_user_id(user_id=user.id)
-    if not user_roles:
-        await call.answer('Недостаточно прав.')
+    order = await models.order.get_order_by_id(id=callback_data.order_id)
+    if callback_data.is_stale and order and order.state == OrderStateEnum.SUCCESS:
+        await call.message.edit_reply_markup(reply_markup=choosePayActionKeyboard(order))
+        await call.answer('Кнопки обновлены, нажмите еще раз.')
         return
-    is_payeer = False
-    for user_role in user_roles:
-        if user_role.role == UserRoleEnum.PAYEER:
-            is_payeer = True
-            break
-    if not is_payeer:
-        await call.answer(f'Недостаточно прав.')
+    if not order or order.state != OrderStateEnum.SUCCESS:
+        await call.answer('Заявка уже обработана.')
         return
     await state.clear()
     await call.message.delete()
-    resp_type = call.data.replace('pay_order_', '')
+    resp_type = 'canceled' if callback_data.action == OrderActionEnum.PAY_CANCELED else 'success'
     await state.set_state(PayOrderSteps.GET_REPLY)
     if resp_type == 'canceled':
         new_message = await call.message.answer(
@@ -46,6 +50,7 @@ async def pay_order(call: CallbackQuery, bot: Bot, state: FSMContext):
             resp_type=resp_type,
             last_message_id=new_message.message_id,
             order_message_id=call.message.reply_to_message.message_id,
+            order_id=str(order.id),
         )
 
         return
@@ -60,33 +65,23 @@ async def pay_order(call: CallbackQuery, bot: Bot, state: FSMContext):
         resp_type=resp_type,
         last_message_id=new_message.message_id,
         order_message_id=call.message.reply_to_message.message_id,
+        order_id=str(order.id),
     )
 
 
-async def reply_order(message: Message, bot: Bot, state: FSMContext):
-    user = await models.user.get_user_by_tg_username(
-        tg_username=message.from_user.username,
-    )
-    if not user:
-        await message.reply('Недостаточно прав.')
-        return
-    user_roles = await models.user_role.get_user_roles_by_user_id(user_id=user.id)
-    if not user_roles:
+async def reply_order(
+    message: Message,
+    bot: Bot,
+    state: FSMContext,
+    roles: frozenset[UserRoleEnum],
+):
+    if UserRoleEnum.PAYEER not in roles:
         await message.reply('Недостаточно прав.')
         return
-    is_payeer = False
-    for user_role in user_roles:
-        if user_role.role == UserRoleEnum.PAYEER:
-            is_payeer = True
-            break
-    if not is_payeer:
-        await message.reply(f'Недостаточно прав.')
-        return
     state_data = await state.get_data()
     resp_type = state_data['resp_type']
     await bot.delete_message(message.chat.id, state_data['last_message_id'])
-    order_message = await models.message.get_message(message.chat.id, state_data['order_message_id'])
-    order = await models.order.get_order_by_id(id=order_message.order_id)
+    order = await models.order.get_order_by_id(id=UUID(state_data['order_id']))
     if resp_type == 'canceled':
         order.state = OrderStateEnum.CANCELED
     else:
@@ -94,33 +89,13 @@ async def reply_order(message: Message, bot: Bot, state: FSMContext):
     order.reply = message.text
     await models.order.update_order(order=order)
     messages = await models.message.get_messages(order.id, MessageTypeEnum.INITIATOR_MESSAGE)
-    for msg in messages: await bot.delete_message(msg.chat_id, msg.message_id)
-    order_text = f'ID: {order.id}\n' \
-    f'Статус: {STATE_ENUM_TO_TEXT[order.state]}\n'\
-    f'Обоснование: {order.reply}\n'\
-    f'Сумма: {order.amount} {order.currency.value}\n'\
-    f'Описание: {order.description}'
+    await delete_order_messages(bot, messages)
+    order_text = get_order_text(order, with_reply=True)
     files = await models.file.get_order_files(order_id=order.id)
     if not files:
         await bot.send_message(messages[-1].chat_id, order_text)
         return
-    media_group = []
-    if files[-1].media_type == FileMediaTypeEnum.DOCUMENT:
-        caption = None
-        for file in files:
-            if file == files[-1]:
-                caption = order_text
-            media_group.append(InputMediaDocument(media=FSInputFile(file.path), caption=caption))
-    else:
-        caption = None
-        for file in files:
-            if file == files[-1]:
-                caption = order_text
-            if file.media_type == FileMediaTypeEnum.PHOTO:
-                media_group.append(InputMediaPhoto(media=FSInputFile(file.path), caption=caption))
-            else:
-                media_group.append(InputMediaVideo(media=FSInputFile(file.path), caption=caption))
-    await bot.send_media_group(messages[-1].chat_id, media_group)
+    await send_order_files(bot, messages[-1].chat_id, files, order_text)
     for file in files: os.remove(file.path)
     await state.clear()
 
@@ -128,36 +103,16 @@ async def reply_order(message: Message, bot: Bot, state: FSMContext):
 async def skip_reply_order(call: CallbackQuery, bot: Bot, state: FSMContext):
     state_data = await state.get_data()
     await bot.delete_message(call.message.chat.id, state_data['last_message_id'])
-    order_message = await models.message.get_message(call.message.chat.id, state_data['order_message_id'])
-    order = await models.order.get_order_by_id(id=order_message.order_id)
+    order = await models.order.get_order_by_id(id=UUID(state_data['order_id']))
     order.state = OrderStateEnum.PAID
     await models.order.update_order(order=order)
     messages = await models.message.get_messages(order.id, MessageTypeEnum.INITIATOR_MESSAGE)
-    for msg in messages: await bot.delete_message(msg.chat_id, msg.message_id)
-    order_text = f'ID: {order.id}\n' \
-    f'Статус: {STATE_ENUM_TO_TEXT[order.state]}\n'\
-    f'Сумма: {order.amount} {order.currency.value}\n'\
-    f'Описание: {order.description}'
+    await delete_order_messages(bot, messages)
+    order_text = get_order_text(order)
     files = await models.file.get_order_files(order_id=order.id)
     if not files:
         await bot.send_message(messages[-1].chat_id, order_text)
         return
-    media_group = []
-    if files[-1].media_type == FileMediaTypeEnum.DOCUMENT:
-        caption = None
-        for file in files:
-            if file == files[-1]:
-                caption = order_text
-            media_group.append(InputMediaDocument(media=FSInputFile(file.path), caption=caption))
-    else:
-        caption = None
-        for file in files:
-            if file == files[-1]:
-                caption = order_text
-            if file.media_type == FileMediaTypeEnum.PHOTO:
-                media_group.append(InputMediaPhoto(media=FSInputFile(file.path), caption=caption))
-            else:
-                media_group.append(InputMediaVideo(media=FSInputFile(file.path), caption=caption))
-    await bot.send_media_group(messages[-1].chat_id, media_group)
+    await send_order_files(bot, messages[-1].chat_id, files, order_text)
     for file in files: os.remove(file.path)
     await state.clear()
\ No newline at end of file
@@ -1,6 +1,9 @@
 from aiogram import Dispatcher, F
 from aiogram.filters import Command, or_f
 
+from core.utils.enums import OrderActionEnum
+from core.utils.order_callback import OrderCallback
+
 
 from .pay_order import pay_order, reply_order, skip_reply_order
 from .states import PayOrderSteps
@@ -8,6 +11,9 @@ from .states import PayOrderSteps
 
 
 def register_handlers(dp: Dispatcher) -> None:
-    dp.callback_query.register(pay_order, F.data.startswith('pay_order_'))
+    dp.callback_query.register(
+        pay_order,
+        OrderCallback.filter(F.action.in_({OrderActionEnum.PAY_SUCCESS, OrderActionEnum.PAY_CANCELED})),
+    )
     dp.message.register(reply_order, PayOrderSteps.GET_REPLY, F.text)
     dp.callback_query.register(skip_reply_order, PayOrderSteps.GET_REPLY)
\ No newline at end of file
@@ -18,6 +18,15 @@ class Database:
     db_port: int
     db_name: str
     url: str
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    pool_recycle: int
+    pool_pre_ping: bool
+    statement_cache_size: int
+    warm_connections: int
+    slow_query_ms: float
+    query_budget: int
 
 
 @dataclass
@@ -25,11 +34,108 @@ class Mongo:
     url: str
 
 
+@dataclass
+class Cache:
+    identity_ttl: float
+    identity_maxsize: int
+    identity_poll_interval: float
+    config_poll_interval: float
+
+
+@dataclass
+class Rates:
+    refresh_interval: float
+    request_timeout: float
+
+
+@dataclass
+class Files:
+    download_concurrency: int
+    download_global_concurrency: int
+    album_delay: float
+    album_max_pending: int
+
+
+@dataclass
+class Outbound:
+    workers: int
+    global_rate: float
+    chat_rate: float
+    group_rate: float
+    burst: int
+    max_retries: int
+
+
+@dataclass
+class Fsm:
+    storage: str
+    ttl: float
+
+
+@dataclass
+class Webhook:
+    mode: str
+    url: str
+    path: str
+    secret: str
+    certificate: str
+    host: str
+    port: int
+    concurrency: int
+    max_pending: int
+
+
+@dataclass
+class Scaling:
+    mode: str
+    partitions: int
+    poll_interval: float
+    max_poll_interval: float
+    rebalance_interval: float
+    batch_size: int
+
+
+@dataclass
+class Concurrency:
+    global_limit: int
+    callbacks: int
+    messages: int
+    media: int
+    shed_threshold: int
+
+
+@dataclass
+class Metrics:
+    port: int
+
+
+@dataclass
+class Recording:
+    path: str
+    salt: str
+
+
+@dataclass
+class Profiling:
+    path: str
+
+
 @dataclass
 class Settings:
     bots: Bots
     database: Database
     mongo: Mongo
+    cache: Cache
+    rates: Rates
+    files: Files
+    outbound: Outbound
+    fsm: Fsm
+    webhook: Webhook
+    scaling: Scaling
+    concurrency: Concurrency
+    metrics: Metrics
+    recording: Recording
+    profiling: Profiling
 
 
 def get_settings():
@@ -46,10 +152,83 @@ def get_settings():
             db_port=getenv("POSTGRES_PORT"),
             db_name=getenv("POSTGRES_DB"),
             url='',
+            pool_size=int(getenv("DB_POOL_SIZE", 10)),
+            max_overflow=int(getenv("DB_MAX_OVERFLOW", 10)),
+            pool_timeout=float(getenv("DB_POOL_TIMEOUT", 30)),
+            pool_recycle=int(getenv("DB_POOL_RECYCLE", 1800)),
+            pool_pre_ping=getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+            statement_cache_size=int(getenv("DB_STATEMENT_CACHE_SIZE", 256)),
+            warm_connections=int(getenv("DB_WARM_CONNECTIONS", 5)),
+            slow_query_ms=float(getenv("DB_SLOW_QUERY_MS", 200)),
+            query_budget=int(getenv("DB_QUERY_BUDGET", 30)),
         ),
         mongo=Mongo(
             url=getenv("MONGO_URL"),
-        )
+        ),
+        cache=Cache(
+            identity_ttl=float(getenv("IDENTITY_CACHE_TTL", 60)),
+            identity_maxsize=int(getenv("IDENTITY_CACHE_MAXSIZE", 1024)),
+            identity_poll_interval=float(getenv("IDENTITY_POLL_INTERVAL", 10)),
+            config_poll_interval=float(getenv("CONFIG_POLL_INTERVAL", 10)),
+        ),
+        rates=Rates(
+            refresh_interval=float(getenv("RATE_REFRESH_INTERVAL", 600)),
+            request_timeout=float(getenv("RATE_REQUEST_TIMEOUT", 5)),
+        ),
+        files=Files(
+            download_concurrency=int(getenv("FILES_DOWNLOAD_CONCURRENCY", 10)),
+            download_global_concurrency=int(getenv("FILES_DOWNLOAD_GLOBAL_CONCURRENCY", 32)),
+            album_delay=float(getenv("FILES_ALBUM_DELAY", 0.6)),
+            album_max_pending=int(getenv("FILES_ALBUM_MAX_PENDING", 256)),
+        ),
+        outbound=Outbound(
+            workers=int(getenv("OUTBOUND_WORKERS", 8)),
+            global_rate=float(getenv("OUTBOUND_GLOBAL_RATE", 30)),
+            chat_rate=float(getenv("OUTBOUND_CHAT_RATE", 1)),
+            group_rate=float(getenv("OUTBOUND_GROUP_RATE", 20 / 60)),
+            burst=int(getenv("OUTBOUND_BURST", 5)),
+            max_retries=int(getenv("OUTBOUND_MAX_RETRIES", 5)),
+        ),
+        fsm=Fsm(
+            storage=getenv("FSM_STORAGE", "postgres"),
+            ttl=float(getenv("FSM_TTL", 7 * 24 * 60 * 60)),
+        ),
+        webhook=Webhook(
+            mode=getenv("BOT_MODE", "polling"),
+            url=getenv("WEBHOOK_URL"),
+            path=getenv("WEBHOOK_PATH", "/webhook"),
+            secret=getenv("WEBHOOK_SECRET"),
+            certificate=getenv("WEBHOOK_CERTIFICATE"),
+            host=getenv("WEBHOOK_HOST", "0.0.0.0"),
+            port=int(getenv("WEBHOOK_PORT", 8080)),
+            concurrency=int(getenv("WEBHOOK_CONCURRENCY", 64)),
+            max_pending=int(getenv("WEBHOOK_MAX_PENDING", 256)),
+        ),
+        scaling=Scaling(
+            mode=getenv("DISPATCH_MODE", "local"),
+            partitions=int(getenv("DISPATCH_PARTITIONS", 16)),
+            poll_interval=float(getenv("DISPATCH_POLL_INTERVAL", 0.1)),
+            max_poll_interval=float(getenv("DISPATCH_MAX_POLL_INTERVAL", 5)),
+            rebalance_interval=float(getenv("DISPATCH_REBALANCE_INTERVAL", 5)),
+            batch_size=int(getenv("DISPATCH_BATCH_SIZE", 100)),
+        ),
+        concurrency=Concurrency(
+            global_limit=int(getenv("CONCURRENCY_GLOBAL", 32)),
+            callbacks=int(getenv("CONCURRENCY_CALLBACKS", 16)),
+            messages=int(getenv("CONCURRENCY_MESSAGES", 16)),
+            media=int(getenv("CONCURRENCY_MEDIA", 4)),
+            shed_threshold=int(getenv("CONCURRENCY_SHED_THRESHOLD", 50)),
+        ),
+        metrics=Metrics(
+            port=int(getenv("METRICS_PORT", 9000)),
+        ),
+        recording=Recording(
+            path=getenv("RECORD_UPDATES_PATH"),
+            salt=getenv("RECORD_UPDATES_SALT", ""),
+        ),
+        profiling=Profiling(
+            path=getenv("PROFILES_PATH", "/data/profiles"),
+        ),
     )
 
 
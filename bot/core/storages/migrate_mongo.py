@@ -0,0 +1,44 @@
+# Copies dialog states from the Mongo storage (FSM_STORAGE=mongo) to Postgres.
+# Run it once with both storages up, before switching to FSM_STORAGE=postgres:
+#
+#   docker compose --profile mongo run --rm bot python -m core.storages.migrate_mongo
+import asyncio
+import logging
+
+from aiogram.fsm.storage.base import StorageKey
+from pymongo import AsyncMongoClient
+
+from core.settings import settings
+from core.storages.postgres_storage import PostgresStorage
+
+
+def parse_key(document_id: str, bot_id: int) -> StorageKey:
+    # PyMongoStorage keys are built by DefaultKeyBuilder(): fsm:<chat_id>[:<thread_id>]:<user_id>
+    parts = [int(part) for part in document_id.split(':')[1:]]
+    chat_id, user_id = parts[0], parts[-1]
+    thread_id = parts[1] if len(parts) == 3 else None
+    return StorageKey(bot_id=bot_id, chat_id=chat_id, user_id=user_id, thread_id=thread_id)
+
+
+async def migrate() -> int:
+    client = AsyncMongoClient(settings.mongo.url)
+    storage = PostgresStorage(ttl=settings.fsm.ttl or None)
+    bot_id = int(settings.bots.bot_token.split(':')[0])
+    copied = 0
+    try:
+        async for document in client['aiogram_fsm']['states_and_data'].find():
+            key = parse_key(document['_id'], bot_id)
+            await storage.set_record(key, document.get('state'), document.get('data') or {})
+            copied += 1
+    finally:
+        await client.close()
+    return copied
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO)
+    logging.info('Copied %s dialog states from Mongo to Postgres', await migrate())
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
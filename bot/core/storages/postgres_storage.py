@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Mapping, Optional
+from uuid import NAMESPACE_URL, UUID, uuid5
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+from core import models
+
+
+class PostgresStorage(BaseStorage):
+    def __init__(self, ttl: float | None = None):
+        self.ttl = ttl
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True, with_business_connection_id=True)
+
+    def _record_id(self, key: StorageKey) -> UUID:
+        return uuid5(NAMESPACE_URL, self.key_builder.build(key))
+
+    def _record(self, key: StorageKey, state: str | None = None, data: dict | None = None) -> models.FsmState:
+        return models.FsmState(
+            id=self._record_id(key),
+            bot_id=key.bot_id,
+            chat_id=key.chat_id,
+            user_id=key.user_id,
+            state=state,
+            data=data,
+            expires_at=datetime.now() + timedelta(seconds=self.ttl) if self.ttl else None,
+        )
+
+    async def get_record(self, key: StorageKey) -> tuple[Optional[str], Dict[str, Any]]:
+        record = await models.fsm_state.get_fsm_state(id=self._record_id(key))
+        if record is None:
+            return None, {}
+        return record.state, dict(record.data)
+
+    async def set_record(self, key: StorageKey, state: StateType, data: Mapping[str, Any]) -> None:
+        state = state.state if isinstance(state, State) else state
+        await models.fsm_state.upsert_fsm_state(
+            fsm_state=self._record(key, state=state, data=dict(data)),
+            fields=['state', 'data'],
+        )
+
+    async def write_changes(
+        self,
+        key: StorageKey,
+        state: StateType,
+        data: Mapping[str, Any],
+        state_changed: bool,
+        data_replaced: bool,
+    ) -> None:
+        state = state.state if isinstance(state, State) else state
+        fields = [field for field, changed in (('state', state_changed), ('data', data_replaced)) if changed]
+        await models.fsm_state.upsert_fsm_state(
+            fsm_state=self._record(key, state=state, data=dict(data)),
+            fields=fields,
+        )
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        await models.fsm_state.upsert_fsm_state(
+            fsm_state=self._record(key, state=state),
+            fields=['state'],
+        )
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self.get_record(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await models.fsm_state.upsert_fsm_state(
+            fsm_state=self._record(key, data=dict(data)),
+            fields=['data'],
+        )
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self.get_record(key)
+        return data
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        await models.fsm_state.upsert_fsm_state(
+            fsm_state=self._record(key, data=dict(data)),
+            fields=[],
+        )
+        return await self.get_data(key)
+
+    async def purge_expired(self) -> None:
+        await models.fsm_state.delete_expired_fsm_states()
+
+    async def close(self) -> None:
+        pass
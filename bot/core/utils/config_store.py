@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from core import models
+from core.database import after_commit
+from core.settings import settings
+
+
+DEFAULT_CONFIGS = {
+    'relation_conditions': {
+        'first_low': 0,
+        'first_high': 2000,
+        'second_low': 2000,
+        'second_high': 20000,
+        'third_low': 20000,
+        'third_high': 40000,
+        'forth_low': 40000,
+    },
+    'payeer_chat_id': {'chat_id': 0},
+}
+
+
+@dataclass(frozen=True)
+class RelationConditions:
+    first_low: float
+    first_high: float
+    second_low: float
+    second_high: float
+    third_low: float
+    third_high: float
+    forth_low: float
+
+
+class ConfigStore:
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._configs: dict[str, dict] = {}
+        self._versions: dict[str, int] = {}
+        self._task: asyncio.Task | None = None
+
+    def get(self, key: str) -> dict | None:
+        return self._configs.get(key)
+
+    def _set(self, key: str, data: dict) -> None:
+        self._configs[key] = data
+
+    async def replace_config(self, config: models.Config) -> None:
+        await models.config.replace_config(config=config)
+        after_commit(lambda: self._set(config.key, config.data))
+
+    async def update_config(self, config: models.Config) -> None:
+        await models.config.update_config(config=config)
+        after_commit(lambda: self._set(config.key, config.data))
+
+    @property
+    def relation_conditions(self) -> RelationConditions:
+        data = self.get('relation_conditions') or DEFAULT_CONFIGS['relation_conditions']
+        return RelationConditions(**{field: data[field] for field in RelationConditions.__dataclass_fields__})
+
+    @property
+    def payeer_chat_id(self) -> int:
+        return (self.get('payeer_chat_id') or DEFAULT_CONFIGS['payeer_chat_id'])['chat_id']
+
+    async def start(self) -> None:
+        await self.refresh()
+        for key in DEFAULT_CONFIGS:
+            if key not in self._configs:
+                config = await models.config.get_config_by_key(key=key)
+                self._configs[key] = config.data
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh(self) -> None:
+        versions = await models.config.get_config_versions()
+        changed = [key for key, version in versions.items() if self._versions.get(key) != version]
+        if changed:
+            for config in await models.config.get_configs_by_keys(keys=changed):
+                self._configs[config.key] = config.data
+                self._versions[config.key] = config.version
+        for key in self._configs.keys() - versions.keys():
+            del self._configs[key]
+            self._versions.pop(key, None)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logging.exception('Config reload failed')
+
+
+config_store = ConfigStore(poll_interval=settings.cache.config_poll_interval)
@@ -0,0 +1,30 @@
+from collections import defaultdict
+
+from aiogram import Bot
+
+from core import models
+
+
+DELETE_MESSAGES_LIMIT = 100
+
+
+async def delete_chat_messages(
+    bot: Bot,
+    chat_id: int,
+    message_ids: list[int | None],
+) -> None:
+    message_ids = [message_id for message_id in message_ids if message_id]
+    for i in range(0, len(message_ids), DELETE_MESSAGES_LIMIT):
+        await bot.delete_messages(chat_id, message_ids[i:i + DELETE_MESSAGES_LIMIT])
+
+
+async def delete_order_messages(
+    bot: Bot,
+    messages: list[models.Message],
+) -> None:
+    # Only the Telegram messages go, the rows still tell later steps which chat the order came from
+    by_chat = defaultdict(list)
+    for message in messages:
+        by_chat[message.chat_id].append(message.message_id)
+    for chat_id, message_ids in by_chat.items():
+        await delete_chat_messages(bot, chat_id, message_ids)
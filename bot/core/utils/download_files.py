@@ -0,0 +1,44 @@
+import asyncio
+import logging
+import os
+from time import perf_counter, time
+from uuid import uuid4
+
+from aiogram import Bot
+from aiogram.types import Document, PhotoSize, Video
+
+from core import models
+from core.settings import settings
+
+
+download_semaphore = asyncio.Semaphore(settings.files.download_global_concurrency)
+
+
+def download_path(file_name: str | None = None) -> str:
+    # Album items are downloaded in parallel, the uuid keeps files with the same name apart
+    name = f'{int(time())}_{uuid4().hex}'
+    return os.path.join('/data', 'files', f'{name}_{file_name}' if file_name else name)
+
+
+async def download_file(
+    bot: Bot,
+    source: Document | PhotoSize | Video,
+    file: models.File,
+    album_semaphore: asyncio.Semaphore,
+) -> float:
+    async with album_semaphore, download_semaphore:
+        start = perf_counter()
+        await bot.download(source, file.path)
+        elapsed = perf_counter() - start
+    logging.info('Downloaded %s in %.2f s', file.path, elapsed)
+    return elapsed
+
+
+async def download_files(
+    bot: Bot,
+    downloads: list[tuple[Document | PhotoSize | Video, models.File]],
+) -> list[float]:
+    album_semaphore = asyncio.Semaphore(settings.files.download_concurrency)
+    return await asyncio.gather(*(
+        download_file(bot, source, file, album_semaphore) for source, file in downloads
+    ))
@@ -31,4 +31,10 @@ class MessageTypeEnum(str, enum.Enum):
 class FileMediaTypeEnum(str, enum.Enum):
     DOCUMENT = 'DOCUMENT'
     PHOTO = 'PHOTO'
-    VIDEO = 'VIDEO'
\ No newline at end of file
+    VIDEO = 'VIDEO'
+
+class OrderActionEnum(str, enum.Enum):
+    MARK_SUCCESS = 'ms'
+    MARK_CANCELED = 'mc'
+    PAY_SUCCESS = 'ps'
+    PAY_CANCELED = 'pc'
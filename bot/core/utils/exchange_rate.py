@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from time import time
+
+import aiohttp
+
+from core import models
+from core.settings import settings
+from core.utils.config_store import config_store
+from core.utils.metrics import EXCHANGE_RATE_FAILURES, EXCHANGE_RATE_STALENESS
+
+
+LINKS = [
+    'https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@latest/v1/currencies/usd.json',
+    'https://latest.currency-api.pages.dev/v1/currencies/usd.json',
+]
+
+DEFAULT_RATE = 100
+RATE_CONFIG_KEY = 'usd_rub_rate'
+
+
+class RateProvider:
+    def __init__(
+        self,
+        links: list[str],
+        refresh_interval: float,
+        request_timeout: float,
+    ):
+        self.links = links
+        self.refresh_interval = refresh_interval
+        self.request_timeout = request_timeout
+        self.rate: float = DEFAULT_RATE
+        self.updated_at: float | None = None
+        self.failures = 0
+        self._session: aiohttp.ClientSession | None = None
+        self._task: asyncio.Task | None = None
+        # Computed on every scrape, so the gauge keeps growing while refreshes fail or hang
+        EXCHANGE_RATE_STALENESS.set_function(lambda: self.staleness if self.updated_at is not None else float('inf'))
+
+    def get_rate(self) -> float:
+        return self.rate
+
+    @property
+    def staleness(self) -> float | None:
+        if self.updated_at is None:
+            return None
+        return time() - self.updated_at
+
+    async def start(self) -> None:
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+        )
+        config = config_store.get(RATE_CONFIG_KEY)
+        if config:
+            self.rate = config['rate']
+            self.updated_at = config['updated_at']
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def refresh(self) -> bool:
+        tasks = [asyncio.create_task(self._fetch(link)) for link in self.links]
+        rate = None
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=self.request_timeout):
+                try:
+                    rate = await next_done
+                    break
+                except Exception:
+                    continue
+        except TimeoutError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if rate is None:
+            self.failures += 1
+            EXCHANGE_RATE_FAILURES.inc()
+            logging.warning(
+                'Could not refresh USD/RUB rate, using %s (stale for %s s, %s failures in a row)',
+                self.rate, self.staleness, self.failures,
+            )
+            return False
+
+        self.rate = rate
+        self.updated_at = time()
+        self.failures = 0
+        await config_store.replace_config(config=models.Config(
+            RATE_CONFIG_KEY,
+            {'rate': self.rate, 'updated_at': self.updated_at},
+        ))
+        return True
+
+    async def _fetch(self, link: str) -> float:
+        async with self._session.get(link) as resp:
+            resp.raise_for_status()
+            return float((await resp.json(content_type=None))['usd']['rub'])
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logging.exception('USD/RUB rate refresh failed')
+            await asyncio.sleep(self.refresh_interval)
+
+
+rate_provider = RateProvider(
+    LINKS,
+    refresh_interval=settings.rates.refresh_interval,
+    request_timeout=settings.rates.request_timeout,
+)
@@ -0,0 +1,19 @@
+from core import models
+from core.utils.maps import STATE_ENUM_TO_TEXT
+
+
+def get_order_text(
+    order: models.Order,
+    initiator_username: str | None = None,
+    with_reply: bool = False,
+) -> str:
+    if initiator_username is not None:
+        header = f'Инициатор: @{initiator_username}\n'
+    else:
+        header = f'Статус: {STATE_ENUM_TO_TEXT[order.state]}\n'
+        if with_reply:
+            header += f'Обоснование: {order.reply}\n'
+    return f'ID: {order.id}\n' \
+    f'{header}'\
+    f'Сумма: {order.amount} {order.currency.value}\n'\
+    f'Описание: {order.description}'
@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.database import after_commit
+from core.models.models import User
+from core.settings import settings
+from core.utils.enums import UserRoleEnum
+from core.utils.ttl_cache import TTLCache
+
+
+@dataclass(frozen=True)
+class Identity:
+    user: User | None
+    roles: frozenset[UserRoleEnum]
+    version: int | None = None
+
+
+identity_cache = TTLCache(
+    maxsize=settings.cache.identity_maxsize,
+    ttl=settings.cache.identity_ttl,
+)
+
+
+def invalidate_identity(session: AsyncSession, *tg_usernames: str | None) -> None:
+    # Evicting before the commit lets a concurrent lookup cache the old rows again
+    def evict():
+        for tg_username in tg_usernames:
+            if tg_username is not None:
+                identity_cache.pop(tg_username)
+
+    after_commit(evict, session)
@@ -0,0 +1,58 @@
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, InputMediaDocument, InputMediaPhoto, InputMediaVideo, Message
+
+from core import models
+from core.utils.enums import FileMediaTypeEnum
+
+
+MEDIA_TYPE_TO_INPUT = {
+    FileMediaTypeEnum.DOCUMENT: InputMediaDocument,
+    FileMediaTypeEnum.PHOTO: InputMediaPhoto,
+    FileMediaTypeEnum.VIDEO: InputMediaVideo,
+}
+
+
+def build_media_group(
+    files: list[models.File],
+    caption: str,
+    use_file_ids: bool = True,
+) -> list[InputMediaDocument | InputMediaPhoto | InputMediaVideo]:
+    media_group = []
+    for file in files:
+        media = file.tg_file_id if use_file_ids and file.tg_file_id else FSInputFile(file.path)
+        media_group.append(MEDIA_TYPE_TO_INPUT[file.media_type](
+            media=media,
+            caption=caption if file == files[-1] else None,
+        ))
+    return media_group
+
+
+def get_message_file_id(message: Message) -> str | None:
+    if message.document:
+        return message.document.file_id
+    if message.photo:
+        return message.photo[-1].file_id
+    if message.video:
+        return message.video.file_id
+    return None
+
+
+async def send_order_files(
+    bot: Bot,
+    chat_id: int,
+    files: list[models.File],
+    caption: str,
+) -> list[Message]:
+    try:
+        return await bot.send_media_group(chat_id, build_media_group(files, caption))
+    except TelegramBadRequest:
+        if not any(file.tg_file_id for file in files):
+            raise
+
+    # A stored file_id is no longer accepted, upload from disk and remember the new ids
+    messages = await bot.send_media_group(chat_id, build_media_group(files, caption, use_file_ids=False))
+    for file, message in zip(files, messages):
+        file.tg_file_id = get_message_file_id(message)
+    await models.file.update_files_tg_file_id(files=files)
+    return messages
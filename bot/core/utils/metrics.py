@@ -0,0 +1,133 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+
+OUTBOUND_QUEUE_DEPTH = Gauge(
+    'bot_outbound_queue_depth',
+    'Telegram API calls waiting for a sender worker',
+)
+OUTBOUND_SEND_SECONDS = Histogram(
+    'bot_outbound_send_seconds',
+    'Time from enqueueing a Telegram API call to its response',
+    ['method'],
+)
+OUTBOUND_RETRIES = Counter(
+    'bot_outbound_retries_total',
+    'Telegram API calls retried after flood control',
+    ['method'],
+)
+
+ALBUMS_PENDING = Gauge(
+    'bot_albums_pending',
+    'Media groups still collecting items',
+)
+ALBUM_ASSEMBLY_SECONDS = Histogram(
+    'bot_album_assembly_seconds',
+    'Time from the first item of a media group to handing the album to the handler',
+    buckets=(0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5),
+)
+ALBUM_FLUSHES = Counter(
+    'bot_album_flushes_total',
+    'Media groups handed to handlers, by what triggered the flush',
+    ['reason'],
+)
+ALBUM_LATE_ITEMS = Counter(
+    'bot_album_late_items_total',
+    'Media group items dropped because their album was already handed to a handler',
+)
+
+UPDATES_WAITING = Gauge(
+    'bot_updates_waiting',
+    'Updates queued for a free handler slot',
+    ['lane'],
+)
+UPDATES_IN_FLIGHT = Gauge(
+    'bot_updates_in_flight',
+    'Updates currently being handled',
+    ['lane'],
+)
+UPDATE_WAIT_SECONDS = Histogram(
+    'bot_update_wait_seconds',
+    'Time an update waited for a handler slot',
+    ['lane'],
+)
+UPDATES_SHED = Counter(
+    'bot_updates_shed_total',
+    'Updates rejected with a retry message because the lane queue was full',
+    ['lane'],
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    'bot_db_pool_checked_out',
+    'Database connections currently checked out of the pool',
+)
+DB_POOL_OVERFLOW = Gauge(
+    'bot_db_pool_overflow',
+    'Database connections open above the configured pool size',
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    'bot_db_pool_wait_seconds',
+    'Time spent getting a connection from the pool, including opening a new one',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+HANDLER_SECONDS = Histogram(
+    'bot_handler_seconds',
+    'Time spent in a message or callback handler',
+    ['handler'],
+)
+HANDLER_ERRORS = Counter(
+    'bot_handler_errors_total',
+    'Handlers that raised an exception',
+    ['handler'],
+)
+DB_QUERIES = Counter(
+    'bot_db_queries_total',
+    'SQL statements executed',
+    ['statement'],
+)
+DB_QUERY_SECONDS = Histogram(
+    'bot_db_query_seconds',
+    'SQL statement execution time',
+    ['statement'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_UPDATE_QUERIES = Histogram(
+    'bot_db_update_queries',
+    'SQL statements executed while processing one update',
+    ['handler'],
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 100),
+)
+DB_SLOW_QUERIES = Counter(
+    'bot_db_slow_queries_total',
+    'SQL statements slower than DB_SLOW_QUERY_MS',
+    ['handler'],
+)
+BOT_API_SECONDS = Histogram(
+    'bot_api_request_seconds',
+    'Telegram Bot API request latency, without time spent in the outbound queue',
+    ['method'],
+)
+BOT_API_ERRORS = Counter(
+    'bot_api_errors_total',
+    'Telegram Bot API requests that failed',
+    ['method', 'error'],
+)
+FSM_STORAGE_SECONDS = Histogram(
+    'bot_fsm_storage_seconds',
+    'Time spent reading or writing FSM state',
+    ['operation'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+ALBUM_SIZE = Histogram(
+    'bot_album_size',
+    'Number of items in an assembled media group',
+    buckets=(1, 2, 3, 4, 5, 6, 7, 8, 9, 10),
+)
+EXCHANGE_RATE_STALENESS = Gauge(
+    'bot_exchange_rate_staleness_seconds',
+    'Age of the USD/RUB rate in use, +Inf before the first successful refresh',
+)
+EXCHANGE_RATE_FAILURES = Counter(
+    'bot_exchange_rate_failures_total',
+    'USD/RUB rate refreshes that got no rate from any source',
+)
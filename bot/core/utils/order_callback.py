@@ -0,0 +1,42 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from uuid import UUID
+
+from aiogram.filters.callback_data import CallbackData
+
+from core.utils.enums import OrderActionEnum
+
+
+# Bump when the layout of OrderCallback changes so old buttons are detected as stale
+ORDER_CALLBACK_VERSION = 1
+
+
+def encode_uuid(id: UUID) -> str:
+    return urlsafe_b64encode(id.bytes).decode().rstrip('=')
+
+
+def decode_uuid(value: str) -> UUID:
+    return UUID(bytes=urlsafe_b64decode(value + '=='))
+
+
+class OrderCallback(CallbackData, prefix='o'):
+    version: int
+    action: OrderActionEnum
+    order: str
+    step: int
+
+    @classmethod
+    def for_order(cls, action: OrderActionEnum, order_id: UUID, step: int) -> 'OrderCallback':
+        return cls(
+            version=ORDER_CALLBACK_VERSION,
+            action=action,
+            order=encode_uuid(order_id),
+            step=step,
+        )
+
+    @property
+    def order_id(self) -> UUID:
+        return decode_uuid(self.order)
+
+    @property
+    def is_stale(self) -> bool:
+        return self.version != ORDER_CALLBACK_VERSION
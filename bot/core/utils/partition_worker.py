@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from math import ceil
+from typing import Any, Dict
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core import models
+from core.database import engine
+
+
+WORKER_LOCK_NAMESPACE = 7301
+PARTITION_LOCK_NAMESPACE = 7302
+LEADER_LOCK_NAMESPACE = 7303
+
+# Telegram keeps undelivered updates for 24 hours, processed ones are remembered as long to drop redeliveries
+PROCESSED_RETENTION = timedelta(days=1)
+
+logger = logging.getLogger(__name__)
+
+
+class ChatChain:
+    # The last non-album update of a chat and the album items fed after it
+    def __init__(self):
+        self.barrier: asyncio.Task | None = None
+        self.albums: set[asyncio.Task] = set()
+
+    def tasks(self) -> list[asyncio.Task]:
+        return [task for task in (self.barrier, *self.albums) if task is not None and not task.done()]
+
+
+class PartitionWorker:
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        partitions: int,
+        poll_interval: float,
+        max_poll_interval: float,
+        rebalance_interval: float,
+        batch_size: int,
+        polling: bool = False,
+    ):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.partitions = partitions
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.rebalance_interval = rebalance_interval
+        self.batch_size = batch_size
+        self.polling = polling
+        self.worker_id = random.randrange(1, 2 ** 31)
+        self.owned: set[int] = set()
+        self.is_leader = False
+        self._connection: AsyncConnection | None = None
+        self._consumers: Dict[int, asyncio.Task] = {}
+        self._wakeups: Dict[int, asyncio.Event] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def chat_of(self, update: Update) -> int:
+        context = UserContextMiddleware.resolve_event_context(update)
+        return context.chat_id or context.user_id or 0
+
+    def partition_of(self, update: Update) -> int:
+        return self.chat_of(update) % self.partitions
+
+    async def enqueue(self, update: Update) -> None:
+        await models.update_queue.add_update(update=models.QueuedUpdate(
+            update_id=update.update_id,
+            partition=self.partition_of(update),
+            payload=update.model_dump(mode='json', by_alias=True, exclude_unset=True),
+        ))
+
+    async def start(self) -> None:
+        connection = await engine.connect()
+        self._connection = await connection.execution_options(isolation_level='AUTOCOMMIT')
+        while not await self._try_lock(WORKER_LOCK_NAMESPACE, self.worker_id):
+            self.worker_id = random.randrange(1, 2 ** 31)
+        raw_connection = await self._connection.get_raw_connection()
+        await raw_connection.driver_connection.add_listener(models.update_queue.NOTIFY_CHANNEL, self._on_notify)
+        await self._rebalance()
+        self._tasks = [asyncio.create_task(self._run())]
+        logger.info('Partition worker %s started with partitions %s', self.worker_id, sorted(self.owned))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Consumers finish the updates in hand and stop once their partition is no longer owned
+        self.owned = set()
+        for wakeup in self._wakeups.values():
+            wakeup.set()
+        await asyncio.gather(*self._consumers.values(), return_exceptions=True)
+        self._consumers = {}
+        if self._connection is not None:
+            # Closing the connection releases every advisory lock this worker holds
+            await self._connection.close()
+            self._connection = None
+        self.owned = set()
+        self.is_leader = False
+
+    async def _try_lock(self, namespace: int, key: int) -> bool:
+        result = await self._connection.execute(
+            text('SELECT pg_try_advisory_lock(:namespace, :key)'),
+            {'namespace': namespace, 'key': key},
+        )
+        return result.scalar()
+
+    async def _unlock(self, namespace: int, key: int) -> None:
+        await self._connection.execute(
+            text('SELECT pg_advisory_unlock(:namespace, :key)'),
+            {'namespace': namespace, 'key': key},
+        )
+
+    async def _count_workers(self) -> int:
+        result = await self._connection.execute(
+            text(
+                'SELECT count(*) FROM pg_locks '
+                "WHERE locktype = 'advisory' AND granted AND objsubid = 2 "
+                'AND classid = CAST(:namespace AS oid) '
+                'AND database = (SELECT oid FROM pg_database WHERE datname = current_database())'
+            ),
+            {'namespace': WORKER_LOCK_NAMESPACE},
+        )
+        return result.scalar()
+
+    async def _rebalance(self) -> None:
+        workers = await self._count_workers()
+        share = ceil(self.partitions / max(workers, 1))
+
+        for partition in sorted(self.owned)[share:]:
+            self.owned.discard(partition)
+            self._wake(partition)
+            consumer = self._consumers.pop(partition, None)
+            if consumer is not None:
+                await asyncio.gather(consumer, return_exceptions=True)
+            await self._unlock(PARTITION_LOCK_NAMESPACE, partition)
+
+        for i in range(self.partitions):
+            if len(self.owned) >= share:
+                break
+            partition = (self.worker_id + i) % self.partitions
+            if partition in self.owned:
+                continue
+            if await self._try_lock(PARTITION_LOCK_NAMESPACE, partition):
+                self.owned.add(partition)
+                self._consumers[partition] = asyncio.create_task(self._consume(partition))
+
+        if self.polling and not self.is_leader and await self._try_lock(LEADER_LOCK_NAMESPACE, 0):
+            self.is_leader = True
+            self._tasks.append(asyncio.create_task(self._poll()))
+            logger.info('Partition worker %s is polling for updates', self.worker_id)
+
+    async def _poll(self) -> None:
+        offset = None
+        allowed_updates = self.dispatcher.resolve_used_update_types()
+        while True:
+            try:
+                updates = await self.bot.get_updates(
+                    offset=offset,
+                    timeout=30,
+                    allowed_updates=allowed_updates,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Failed to fetch updates')
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                await self.enqueue(update)
+                offset = update.update_id + 1
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.rebalance_interval)
+            try:
+                await self._rebalance()
+                if self.is_leader:
+                    await models.update_queue.delete_processed_updates(
+                        before=datetime.now() - PROCESSED_RETENTION,
+                    )
+            except Exception:
+                logger.exception('Partition worker %s failed to rebalance', self.worker_id)
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        self._wake(int(payload))
+
+    def _wake(self, partition: int) -> None:
+        wakeup = self._wakeups.get(partition)
+        if wakeup is not None:
+            wakeup.set()
+
+    async def _consume(self, partition: int) -> None:
+        # Chats of a partition are handled concurrently and updates of one chat in order,
+        # so a slow handler only holds up its own chat
+        wakeup = self._wakeups[partition] = asyncio.Event()
+        chains: Dict[int, ChatChain] = {}
+        in_flight: set[asyncio.Task] = set()
+        delay = self.poll_interval
+        try:
+            while partition in self.owned:
+                if len(in_flight) >= self.batch_size:
+                    await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                # Cleared before fetching, so a NOTIFY that arrives during the fetch is not lost
+                wakeup.clear()
+                try:
+                    updates = await models.update_queue.get_updates_by_partitions(
+                        partitions=[partition],
+                        limit=self.batch_size - len(in_flight),
+                    )
+                    if updates:
+                        # Claimed before feeding: updates interrupted by a crash are dropped rather than handled twice
+                        await models.update_queue.mark_updates_processed(ids=[update.id for update in updates])
+                except Exception:
+                    logger.exception('Failed to fetch queued updates of partition %s', partition)
+                    updates = []
+                if updates:
+                    delay = self.poll_interval
+                    self._dispatch(updates, chains, in_flight)
+                    continue
+                # NOTIFY from enqueue wakes the partition up, polling is only a fallback and backs off while idle
+                try:
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2, self.max_poll_interval)
+        finally:
+            if self._wakeups.get(partition) is wakeup:
+                del self._wakeups[partition]
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    def _dispatch(
+        self,
+        updates: list[models.QueuedUpdate],
+        chains: Dict[int, ChatChain],
+        in_flight: set[asyncio.Task],
+    ) -> None:
+        for chat in [chat for chat, chain in chains.items() if not chain.tasks()]:
+            del chains[chat]
+        for queued in updates:
+            try:
+                update = Update.model_validate(queued.payload, context={'bot': self.bot})
+            except Exception:
+                logger.exception('Failed to parse update %s', queued.update_id)
+                continue
+            chain = chains.setdefault(self.chat_of(update), ChatChain())
+            if update.message and update.message.media_group_id:
+                # Album items must reach MediaGroupMiddleware together, the first one waits for the rest
+                task = asyncio.create_task(self._feed(update, [chain.barrier]))
+                chain.albums.add(task)
+            else:
+                task = asyncio.create_task(self._feed(update, chain.tasks()))
+                chain.barrier = task
+                chain.albums = set()
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+    async def _feed(self, update: Update, after: list[asyncio.Task | None]) -> None:
+        await asyncio.gather(*(task for task in after if task is not None), return_exceptions=True)
+        try:
+            await self.dispatcher.feed_update(self.bot, update)
+        except Exception:
+            logger.exception('Failed to process update %s', update.update_id)
@@ -0,0 +1,133 @@
+import asyncio
+import cProfile
+import logging
+import pstats
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict
+
+from core.settings import settings
+
+
+MIN_FRAME_SECONDS = 0.000001
+MAX_STACK_DEPTH = 64
+
+logger = logging.getLogger(__name__)
+
+
+def frame_name(func: tuple) -> str:
+    filename, lineno, name = func
+    if filename == '~':
+        return name
+    return f'{name} ({Path(filename).name}:{lineno})'
+
+
+def collapse_stats(stats: pstats.Stats) -> Counter[str]:
+    # cProfile keeps caller/callee pairs, not full stacks. Stacks are rebuilt from the
+    # roots, splitting a function's time between its callees by their share of it
+    callees: Dict[tuple, Dict[tuple, tuple]] = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge
+
+    stacks: Counter[str] = Counter()
+
+    def walk(func: tuple, stack: list[tuple], own: float, total: float) -> None:
+        func_total = stats.stats[func][3]
+        share = total / func_total if func_total else 0
+        children = []
+        for callee, (_, _, callee_own, callee_total) in callees.get(func, {}).items():
+            if callee in stack:
+                # Recursion is folded into the frame that is already on the stack
+                own += callee_own * share
+            elif callee_total * share >= MIN_FRAME_SECONDS:
+                children.append((callee, callee_own * share, callee_total * share))
+
+        if own >= MIN_FRAME_SECONDS:
+            stacks[';'.join(frame_name(frame) for frame in stack)] += round(own * 1_000_000)
+        if len(stack) < MAX_STACK_DEPTH:
+            for callee, callee_own, callee_total in children:
+                walk(callee, stack + [callee], callee_own, callee_total)
+
+    for func, (_, _, own, total, callers) in stats.stats.items():
+        if not callers:
+            walk(func, [func], own, total)
+    return stacks
+
+
+def write_profile(profile: cProfile.Profile, session_path: Path, name: str) -> list[Path]:
+    session_path.mkdir(parents=True, exist_ok=True)
+    stats = pstats.Stats(profile)
+    stats_path = session_path / f'{name}.pstats'
+    stats.dump_stats(stats_path)
+    collapsed_path = session_path / f'{name}.collapsed'
+    collapsed_path.write_text(''.join(
+        f'{stack} {value}\n' for stack, value in sorted(collapse_stats(stats).items())
+    ))
+    return [stats_path, collapsed_path]
+
+
+class Profiler:
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.limit = 0
+        self.session_path: Path | None = None
+        self.counts: Counter[str] = Counter()
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._busy = False
+        self._dumps: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    async def start(self, limit: int) -> None:
+        await self.stop()
+        self.limit = limit
+        self.session_path = self.path / datetime.now().strftime('%Y%m%d-%H%M%S')
+
+    async def stop(self) -> list[Path]:
+        dumps = [*self._dumps, *(self._dump(name) for name in list(self._profiles))]
+        self.limit = 0
+        self.counts.clear()
+        return [path for paths in await asyncio.gather(*dumps) for path in paths]
+
+    async def profile(
+        self,
+        name: str,
+        handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: Dict[str, Any],
+    ) -> Any:
+        # Only one cProfile can be active per thread. While a handler is profiled the
+        # profile also records whatever else the event loop runs during its awaits
+        if self._busy or self.counts[name] >= self.limit:
+            return await handler(event, data)
+
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        self.counts[name] += 1
+        self._busy = True
+        profile.enable()
+        try:
+            return await handler(event, data)
+        finally:
+            profile.disable()
+            self._busy = False
+            if self.enabled and self.counts[name] >= self.limit:
+                # Written in the background, the handler doesn't wait for the stats to be collapsed
+                task = asyncio.create_task(self._dump(name))
+                self._dumps.add(task)
+                task.add_done_callback(self._dumps.discard)
+
+    async def _dump(self, name: str) -> list[Path]:
+        profile = self._profiles.pop(name, None)
+        if profile is None:
+            return []
+        count, session_path = self.counts[name], self.session_path
+        paths = await asyncio.to_thread(write_profile, profile, session_path, name)
+        logger.info('Saved %s profiles of %s to %s', count, name, session_path)
+        return paths
+
+
+profiler = Profiler(settings.profiling.path)
@@ -0,0 +1,43 @@
+import asyncio
+from time import monotonic
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, max_debt: float | None = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_debt = max_debt
+        self.tokens = capacity
+        self.updated_at = monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, monotonic() + seconds)
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        # Returns 0 when the tokens were taken, otherwise how long to wait before trying again.
+        # A call costing more than the capacity goes through on a full bucket and leaves it in debt,
+        # at most max_debt tokens deep when that is set
+        pause = self.paused_until - monotonic()
+        if pause > 0:
+            return pause
+        self._refill()
+        needed = min(tokens, self.capacity)
+        if self.tokens >= needed:
+            self.tokens -= tokens
+            if self.max_debt is not None:
+                self.tokens = max(self.tokens, -self.max_debt)
+            return 0
+        return (needed - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1) -> None:
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
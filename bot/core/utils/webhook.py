@@ -0,0 +1,73 @@
+import asyncio
+from typing import Any, Dict
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+from core.utils.partition_worker import PartitionWorker
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        concurrency: int,
+        max_pending: int,
+        secret_token: str | None = None,
+        **data: Any,
+    ) -> None:
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            secret_token=secret_token,
+            **data,
+        )
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.pending = asyncio.Semaphore(max_pending)
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        try:
+            async with self.semaphore:
+                await super()._background_feed_update(bot, update)
+        finally:
+            self.pending.release()
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        # Telegram waits for the response before sending more, so a full backlog slows it down
+        await self.pending.acquire()
+        try:
+            return await super()._handle_request_background(bot, request)
+        except BaseException:
+            self.pending.release()
+            raise
+
+
+class QueueRequestHandler(SimpleRequestHandler):
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        worker: PartitionWorker,
+        secret_token: str | None = None,
+        **data: Any,
+    ) -> None:
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            secret_token=secret_token,
+            **data,
+        )
+        self.worker = worker
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = Update.model_validate(
+            await request.json(loads=bot.session.json_loads),
+            context={"bot": bot},
+        )
+        await self.worker.enqueue(update)
+        return web.json_response({}, dumps=bot.session.json_dumps)
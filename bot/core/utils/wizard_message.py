@@ -0,0 +1,35 @@
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
+from aiogram.types import InlineKeyboardMarkup, Message
+
+
+async def edit_wizard_message(
+    bot: Bot,
+    state: FSMContext,
+    chat_id: int,
+    text: str,
+    reply_markup: InlineKeyboardMarkup | None = None,
+) -> Message | bool:
+    last_chat_id = await state.get_value('last_chat_id')
+    last_message_id = await state.get_value('last_message_id')
+
+    if last_message_id is not None:
+        try:
+            return await bot.edit_message_text(
+                text=text,
+                chat_id=last_chat_id,
+                message_id=last_message_id,
+                reply_markup=reply_markup,
+            )
+        except TelegramBadRequest as e:
+            if 'message is not modified' in e.message:
+                return True
+        try:
+            await bot.delete_message(last_chat_id, last_message_id)
+        except TelegramBadRequest:
+            pass
+
+    new_message = await bot.send_message(chat_id, text, reply_markup=reply_markup)
+    await state.update_data(last_chat_id=new_message.chat.id, last_message_id=new_message.message_id)
+    return new_message
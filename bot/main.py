@@ -1,26 +1,71 @@
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.types import FSInputFile
+from aiohttp import web
+from prometheus_client import start_http_server
+from core.middlewares.api_metrics_middleware import ApiMetricsMiddleware
+from core.middlewares.concurrency_middleware import ConcurrencyMiddleware, LANE_CALLBACKS, LANE_MEDIA, LANE_MESSAGES
+from core.middlewares.database_middleware import DatabaseMiddleware
+from core.middlewares.handler_metrics_middleware import HandlerMetricsMiddleware
+from core.middlewares.identity_middleware import IdentityMiddleware, identity_watcher
 from core.middlewares.media_group_middleware import MediaGroupMiddleware
+from core.middlewares.outbound_middleware import OutboundMiddleware
+from core.middlewares.profiling_middleware import ProfilingMiddleware
+from core.middlewares.state_snapshot_middleware import StateSnapshotMiddleware
+from core.middlewares.update_recorder_middleware import UpdateRecorderMiddleware
+from core.database import warm_pool
 from core.settings import settings
-from aiogram.fsm.storage.pymongo import PyMongoStorage
+from core.storages.postgres_storage import PostgresStorage
 import asyncio
 import logging
 
+from core.utils.config_store import config_store
+from core.utils.exchange_rate import rate_provider
 from core.utils.set_commands import set_commands
+from core.utils.partition_worker import PartitionWorker
+from core.utils.webhook import BoundedRequestHandler, QueueRequestHandler
 
 from core.modules import admin, initiator, inspector, common, payeer
 
 
-async def start_bot(bot: Bot):
+def get_storage():
+    if settings.fsm.storage == 'mongo':
+        from aiogram.fsm.storage.pymongo import PyMongoStorage
+        return PyMongoStorage.from_url(settings.mongo.url)
+    return PostgresStorage(ttl=settings.fsm.ttl or None)
+
+
+async def start_bot(bot: Bot, dispatcher: Dispatcher):
+    await warm_pool(settings.database.warm_connections)
+    if isinstance(dispatcher.storage, PostgresStorage):
+        await dispatcher.storage.purge_expired()
     await set_commands(bot)
+    await config_store.start()
+    await identity_watcher.start()
+    await rate_provider.start()
+    if settings.webhook.mode == 'webhook':
+        certificate = settings.webhook.certificate
+        await bot.set_webhook(
+            url=settings.webhook.url + settings.webhook.path,
+            secret_token=settings.webhook.secret,
+            certificate=FSInputFile(certificate) if certificate else None,
+            allowed_updates=dispatcher.resolve_used_update_types(),
+        )
+    else:
+        await bot.delete_webhook()
 
 
-async def main():
-    logging.basicConfig(level=logging.INFO)
-    bot = Bot(token=settings.bots.bot_token, default=DefaultBotProperties(parse_mode="HTML"))
-    dp = Dispatcher(storage=PyMongoStorage.from_url(settings.mongo.url))
-    
+async def stop_bot(bot: Bot):
+    await rate_provider.stop()
+    await config_store.stop()
+    await identity_watcher.stop()
+
+
+def create_dispatcher(handler_timings: dict[str, list[float]] | None = None) -> Dispatcher:
+    dp = Dispatcher(storage=get_storage(), disable_fsm=True)
+
     dp.startup.register(start_bot)
+    dp.shutdown.register(stop_bot)
 
     admin.register_handlers(dp)
     common.register_handlers(dp)
@@ -28,11 +73,131 @@ async def main():
     inspector.register_handlers(dp)
     payeer.register_handlers(dp)
 
-    dp.message.middleware(MediaGroupMiddleware())
+    # Admission control runs before DatabaseMiddleware, so a waiting or shed update never holds a pool connection
+    concurrency_middleware = ConcurrencyMiddleware(
+        global_limit=settings.concurrency.global_limit,
+        lane_limits={
+            LANE_CALLBACKS: settings.concurrency.callbacks,
+            LANE_MESSAGES: settings.concurrency.messages,
+            LANE_MEDIA: settings.concurrency.media,
+        },
+        shed_threshold=settings.concurrency.shed_threshold,
+    )
+
+    if settings.recording.path:
+        recorder = UpdateRecorderMiddleware(settings.recording.path, settings.recording.salt)
+        dp.update.outer_middleware(recorder)
+        dp.startup.register(recorder.start)
+        dp.shutdown.register(recorder.close)
+    dp.update.outer_middleware(concurrency_middleware)
+    dp.update.outer_middleware(DatabaseMiddleware())
+    dp.update.outer_middleware(StateSnapshotMiddleware(
+        storage=dp.storage,
+        events_isolation=dp.fsm.events_isolation,
+        strategy=dp.fsm.strategy,
+    ))
+    dp.update.middleware(IdentityMiddleware())
+    if settings.recording.path:
+        dp.update.middleware(recorder.capture_roles)
+    dp.message.middleware(MediaGroupMiddleware(
+        delay=settings.files.album_delay,
+        max_pending=settings.files.album_max_pending,
+    ))
+
+    dp.message.middleware(HandlerMetricsMiddleware(handler_timings))
+    dp.callback_query.middleware(HandlerMetricsMiddleware(handler_timings))
+    dp.message.middleware(ProfilingMiddleware())
+    dp.callback_query.middleware(ProfilingMiddleware())
+    return dp
+
+
+async def start_web_app(handler) -> web.AppRunner:
+    app = web.Application()
+    handler.register(app, path=settings.webhook.path)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.webhook.host, settings.webhook.port)
+    await site.start()
+    return runner
 
 
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    workflow_data = {"dispatcher": dp, "bot": bot, **dp.workflow_data}
+    await dp.emit_startup(**workflow_data)
+    runner = await start_web_app(BoundedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        concurrency=settings.webhook.concurrency,
+        max_pending=settings.webhook.max_pending,
+        secret_token=settings.webhook.secret,
+    ))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await dp.emit_shutdown(**workflow_data)
+
+
+async def run_partitioned(dp: Dispatcher, bot: Bot):
+    worker = PartitionWorker(
+        dispatcher=dp,
+        bot=bot,
+        partitions=settings.scaling.partitions,
+        poll_interval=settings.scaling.poll_interval,
+        max_poll_interval=settings.scaling.max_poll_interval,
+        rebalance_interval=settings.scaling.rebalance_interval,
+        batch_size=settings.scaling.batch_size,
+        polling=settings.webhook.mode != 'webhook',
+    )
+    workflow_data = {"dispatcher": dp, "bot": bot, **dp.workflow_data}
+    await dp.emit_startup(**workflow_data)
+    runner = None
+    if settings.webhook.mode == 'webhook':
+        runner = await start_web_app(QueueRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            worker=worker,
+            secret_token=settings.webhook.secret,
+        ))
+    await worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        await worker.stop()
+        await dp.emit_shutdown(**workflow_data)
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO)
+    if settings.webhook.mode == 'webhook' and not settings.webhook.secret:
+        raise RuntimeError('WEBHOOK_SECRET must be set in webhook mode')
+    if settings.metrics.port:
+        start_http_server(settings.metrics.port)
+    bot = Bot(token=settings.bots.bot_token, default=DefaultBotProperties(parse_mode="HTML"))
+    outbound_middleware = OutboundMiddleware(
+        workers=settings.outbound.workers,
+        global_rate=settings.outbound.global_rate,
+        chat_rate=settings.outbound.chat_rate,
+        group_rate=settings.outbound.group_rate,
+        burst=settings.outbound.burst,
+        max_retries=settings.outbound.max_retries,
+    )
+    bot.session.middleware(outbound_middleware)
+    bot.session.middleware(ApiMetricsMiddleware())
+    dp = create_dispatcher()
+    dp.startup.register(outbound_middleware.start)
+    dp.shutdown.register(outbound_middleware.close)
+
     try:
-        await dp.start_polling(bot)
+        if settings.scaling.mode == 'partitioned':
+            await run_partitioned(dp, bot)
+        elif settings.webhook.mode == 'webhook':
+            await run_webhook(dp, bot)
+        else:
+            await dp.start_polling(bot)
     finally:
         await bot.session.close()
 
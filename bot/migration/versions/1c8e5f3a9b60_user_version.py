@@ -0,0 +1,53 @@
+"""user version
+
+Revision ID: 1c8e5f3a9b60
+Revises: 6f2a9d4c8e17
+Create Date: 2026-10-20 11:22:47.306915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c8e5f3a9b60'
+down_revision: Union[str, None] = '6f2a9d4c8e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('version', sa.BigInteger(), server_default=sa.text('1'), nullable=False))
+    op.execute(
+        'CREATE FUNCTION users_bump_version() RETURNS trigger AS $$ '
+        'BEGIN NEW.version := OLD.version + 1; RETURN NEW; END; '
+        '$$ LANGUAGE plpgsql'
+    )
+    op.execute(
+        'CREATE TRIGGER users_bump_version BEFORE UPDATE ON users '
+        'FOR EACH ROW EXECUTE FUNCTION users_bump_version()'
+    )
+    op.execute(
+        'CREATE FUNCTION users_roles_bump_user_version() RETURNS trigger AS $$ '
+        'BEGIN '
+        "IF TG_OP <> 'INSERT' THEN UPDATE users SET version = version + 1 WHERE id = OLD.user_id; END IF; "
+        "IF TG_OP <> 'DELETE' THEN UPDATE users SET version = version + 1 WHERE id = NEW.user_id; END IF; "
+        'RETURN NULL; END; '
+        '$$ LANGUAGE plpgsql'
+    )
+    op.execute(
+        'CREATE TRIGGER users_roles_bump_user_version AFTER INSERT OR UPDATE OR DELETE ON users_roles '
+        'FOR EACH ROW EXECUTE FUNCTION users_roles_bump_user_version()'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER users_roles_bump_user_version ON users_roles')
+    op.execute('DROP FUNCTION users_roles_bump_user_version()')
+    op.execute('DROP TRIGGER users_bump_version ON users')
+    op.execute('DROP FUNCTION users_bump_version()')
+    op.drop_column('users', 'version')
@@ -0,0 +1,44 @@
+"""update queue dedup
+
+Revision ID: 3b7d2f6e8a41
+Revises: 9e4c1b7a3f58
+Create Date: 2026-10-19 10:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7d2f6e8a41'
+down_revision: Union[str, None] = '9e4c1b7a3f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('update_queue', sa.Column('processed_at', sa.DateTime(), nullable=True))
+    op.execute(
+        'DELETE FROM update_queue a USING update_queue b '
+        'WHERE a.update_id = b.update_id AND (a.created_at, a.id) > (b.created_at, b.id)'
+    )
+    op.create_unique_constraint('update_queue_update_id_key', 'update_queue', ['update_id'])
+    op.drop_index('ix_update_queue_partition_update_id', table_name='update_queue')
+    op.create_index(
+        'ix_update_queue_partition_update_id',
+        'update_queue',
+        ['partition', 'update_id'],
+        unique=False,
+        postgresql_where=sa.text('processed_at IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_update_queue_partition_update_id', table_name='update_queue')
+    op.create_index('ix_update_queue_partition_update_id', 'update_queue', ['partition', 'update_id'], unique=False)
+    op.drop_constraint('update_queue_update_id_key', 'update_queue', type_='unique')
+    op.drop_column('update_queue', 'processed_at')
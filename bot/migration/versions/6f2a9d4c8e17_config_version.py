@@ -0,0 +1,39 @@
+"""config version
+
+Revision ID: 6f2a9d4c8e17
+Revises: 3b7d2f6e8a41
+Create Date: 2026-10-19 16:40:12.804531
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f2a9d4c8e17'
+down_revision: Union[str, None] = '3b7d2f6e8a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('configs', sa.Column('version', sa.BigInteger(), server_default=sa.text('1'), nullable=False))
+    op.execute(
+        'CREATE FUNCTION configs_bump_version() RETURNS trigger AS $$ '
+        'BEGIN NEW.version := OLD.version + 1; RETURN NEW; END; '
+        '$$ LANGUAGE plpgsql'
+    )
+    op.execute(
+        'CREATE TRIGGER configs_bump_version BEFORE UPDATE ON configs '
+        'FOR EACH ROW EXECUTE FUNCTION configs_bump_version()'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER configs_bump_version ON configs')
+    op.execute('DROP FUNCTION configs_bump_version()')
+    op.drop_column('configs', 'version')
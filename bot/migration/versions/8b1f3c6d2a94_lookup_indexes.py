@@ -0,0 +1,49 @@
+"""Lookup indexes
+
+Revision ID: 8b1f3c6d2a94
+Revises: 2e48025317c9
+Create Date: 2026-10-18 12:04:31.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1f3c6d2a94'
+down_revision: Union[str, None] = '2e48025317c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_messages_chat_id_message_id', 'messages', ['chat_id', 'message_id'], unique=False)
+    op.create_index('ix_messages_order_id_message_type', 'messages', ['order_id', 'message_type'], unique=False)
+    op.create_index(op.f('ix_files_order_id'), 'files', ['order_id'], unique=False)
+    op.create_index(op.f('ix_users_roles_user_id'), 'users_roles', ['user_id'], unique=False)
+    op.create_index(op.f('ix_relations_initiator_id'), 'relations', ['initiator_id'], unique=False)
+    op.create_index('ix_orders_initiator_id_state', 'orders', ['initiator_id', 'state'], unique=False)
+    # Keep the most recent row for every key before making it unique
+    op.execute(
+        'DELETE FROM configs WHERE id IN ('
+        'SELECT id FROM ('
+        'SELECT id, row_number() OVER ('
+        'PARTITION BY key ORDER BY coalesce(updated_at, created_at) DESC'
+        ') AS rn FROM configs'
+        ') ranked WHERE ranked.rn > 1'
+        ')'
+    )
+    op.create_unique_constraint('configs_key_key', 'configs', ['key'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('configs_key_key', 'configs', type_='unique')
+    op.drop_index('ix_orders_initiator_id_state', table_name='orders')
+    op.drop_index(op.f('ix_relations_initiator_id'), table_name='relations')
+    op.drop_index(op.f('ix_users_roles_user_id'), table_name='users_roles')
+    op.drop_index(op.f('ix_files_order_id'), table_name='files')
+    op.drop_index('ix_messages_order_id_message_type', table_name='messages')
+    op.drop_index('ix_messages_chat_id_message_id', table_name='messages')
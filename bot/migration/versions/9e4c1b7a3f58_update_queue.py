@@ -0,0 +1,39 @@
+"""update queue
+
+Revision ID: 9e4c1b7a3f58
+Revises: 5d9a0e3b7c12
+Create Date: 2026-10-18 16:41:09.532871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4c1b7a3f58'
+down_revision: Union[str, None] = '5d9a0e3b7c12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('update_queue',
+    sa.Column('update_id', sa.BigInteger(), nullable=False),
+    sa.Column('partition', sa.Integer(), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_update_queue_partition_update_id', 'update_queue', ['partition', 'update_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_update_queue_partition_update_id', table_name='update_queue')
+    op.drop_table('update_queue')
@@ -0,0 +1,28 @@
+"""Files tg_file_id
+
+Revision ID: c4e2a7d91f05
+Revises: 8b1f3c6d2a94
+Create Date: 2026-10-18 13:21:07.340915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e2a7d91f05'
+down_revision: Union[str, None] = '8b1f3c6d2a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('files', sa.Column('tg_file_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('files', 'tg_file_id')